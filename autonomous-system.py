@@ -15,11 +15,13 @@ from datetime import datetime, timedelta
 from pathlib import Path
 import signal
 import atexit
+import select
 from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from enum import Enum
 import threading
 import queue
+from concurrent.futures import ThreadPoolExecutor
 import psutil
 
 # Configure logging
@@ -54,6 +56,7 @@ class AgentInfo:
     restart_count: int = 0
     memory_usage: float = 0.0
     cpu_usage: float = 0.0
+    capture_argv: Optional[List[str]] = field(default=None, repr=False)
 
 class EnhancedAutonomousLauncher:
     def __init__(self):
@@ -65,6 +68,7 @@ class EnhancedAutonomousLauncher:
         self.monitoring_thread = None
         self.stop_event = threading.Event()
         self.message_queue = queue.Queue()
+        self._cleaned_up = False
         
         # Performance settings
         self.max_agent_memory = 2048  # MB
@@ -79,8 +83,9 @@ class EnhancedAutonomousLauncher:
         self.state_dir = self.base_dir / "mcp-coordinator" / "launcher"
         self.state_dir.mkdir(parents=True, exist_ok=True)
         
-        # Register cleanup handlers
-        atexit.register(self.cleanup)
+        # Register cleanup handlers; at interpreter exit no new threads or
+        # executor futures can be started, so agents are stopped one by one
+        atexit.register(self.cleanup, parallel=False)
         signal.signal(signal.SIGINT, self.signal_handler)
         signal.signal(signal.SIGTERM, self.signal_handler)
     
@@ -148,14 +153,16 @@ class EnhancedAutonomousLauncher:
         logger.info(f"Created default config at {self.config_file}")
     
     def signal_handler(self, signum, frame):
-        """Enhanced signal handling"""
+        """Enhanced signal handling - wake the main loop, which runs cleanup"""
         logger.info(f"Received signal {signum}, initiating graceful shutdown...")
         self.stop_event.set()
-        self.cleanup()
-        sys.exit(0)
     
-    def cleanup(self):
-        """Enhanced cleanup with state persistence"""
+    def cleanup(self, parallel: bool = True):
+        """Enhanced cleanup with state persistence; runs at most once"""
+        if self._cleaned_up:
+            return
+        self._cleaned_up = True
+        
         logger.info("Starting cleanup process...")
         
         # Stop monitoring
@@ -164,12 +171,13 @@ class EnhancedAutonomousLauncher:
         # Save complete system state
         self.save_system_state()
         
-        # Gracefully stop all agents
-        for agent_id, agent in self.agents.items():
-            try:
+        # Gracefully stop all agents - each stop is a tmux round-trip, so
+        # run them in parallel unless we're already shutting down
+        if parallel:
+            self.stop_agents_parallel(list(self.agents.values()))
+        else:
+            for agent in list(self.agents.values()):
                 self.stop_agent_gracefully(agent)
-            except Exception as e:
-                logger.error(f"Error stopping agent {agent_id}: {e}")
         
         # Wait for monitoring thread
         if self.monitoring_thread and self.monitoring_thread.is_alive():
@@ -426,6 +434,10 @@ class EnhancedAutonomousLauncher:
                     logger.error(f"Failed to send command to {window}: {e}")
                     raise
     
+    def pane_capture_argv(self, window: str) -> List[str]:
+        """tmux command that prints the visible contents of an agent window"""
+        return ['tmux', 'capture-pane', '-t', f'{self.session_name}:{window}', '-p']
+    
     def launch_agent(self, role: str, index: int = 0) -> Optional[str]:
         """Enhanced agent launch with health checks"""
         agent_id = f"{role}-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{index}"
@@ -443,7 +455,9 @@ class EnhancedAutonomousLauncher:
             role=role,
             window=window,
             started_at=datetime.now().isoformat(),
-            state=AgentState.STARTING
+            state=AgentState.STARTING,
+            # Built once here instead of on every health check
+            capture_argv=self.pane_capture_argv(window)
         )
         
         try:
@@ -524,6 +538,47 @@ Let me begin by reading my instructions now."""
             self.agents[agent_id] = agent
             return None
     
+    def run_capture(self, argv: List[str], timeout: float = 5) -> str:
+        """Run a short helper command (tmux) and return its stdout
+        
+        Uses posix_spawnp with a single stdout pipe where available, which
+        skips subprocess' fork/preexec machinery for these tiny, frequent calls.
+        """
+        if not hasattr(os, 'posix_spawnp'):
+            return subprocess.run(
+                argv, capture_output=True, text=True, timeout=timeout
+            ).stdout
+        
+        read_fd, write_fd = os.pipe()
+        try:
+            pid = os.posix_spawnp(argv[0], argv, os.environ, file_actions=[
+                (os.POSIX_SPAWN_DUP2, write_fd, 1),
+                (os.POSIX_SPAWN_OPEN, 2, os.devnull, os.O_WRONLY, 0)
+            ])
+        except Exception:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+        
+        chunks = []
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not select.select([read_fd], [], [], remaining)[0]:
+                    os.kill(pid, signal.SIGKILL)
+                    raise subprocess.TimeoutExpired(argv, timeout)
+                chunk = os.read(read_fd, 65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        finally:
+            os.close(read_fd)
+            os.waitpid(pid, 0)
+        
+        return b''.join(chunks).decode('utf-8', errors='replace')
+    
     def get_agent_pid(self, window: str) -> Optional[int]:
         """Get PID of agent process"""
         try:
@@ -560,6 +615,21 @@ Let me begin by reading my instructions now."""
         except Exception as e:
             logger.error(f"Error stopping agent {agent.id}: {e}")
     
+    def stop_agents_parallel(self, agents: List[AgentInfo]):
+        """Stop several agents concurrently instead of one after another"""
+        if not agents:
+            return
+        
+        # Cap concurrency so we don't flood the tmux server
+        max_workers = min(len(agents), (os.cpu_count() or 1) * 2)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(self.stop_agent_gracefully, agent): agent for agent in agents}
+            for future, agent in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f"Error stopping agent {agent.id}: {e}")
+    
     def launch_all_agents(self):
         """Launch all configured agents with intelligent scheduling"""
         logger.info("Launching all configured agents...")
@@ -574,10 +644,12 @@ Let me begin by reading my instructions now."""
             # Launch high priority agents first
             if priority == 'high':
                 for i in range(max_instances):
+                    if self.stop_event.is_set():
+                        break
                     agent_id = self.launch_agent(role, i)
                     if agent_id:
                         total_agents += 1
-                    time.sleep(self.agent_startup_delay)
+                    self.stop_event.wait(self.agent_startup_delay)
         
         # Then launch medium and low priority
         for priority_level in ['medium', 'low']:
@@ -585,10 +657,12 @@ Let me begin by reading my instructions now."""
                 if role_config.get('priority', 'medium') == priority_level:
                     max_instances = role_config.get('max_instances', 1)
                     for i in range(max_instances):
+                        if self.stop_event.is_set():
+                            break
                         agent_id = self.launch_agent(role, i)
                         if agent_id:
                             total_agents += 1
-                        time.sleep(self.agent_startup_delay)
+                        self.stop_event.wait(self.agent_startup_delay)
         
         logger.info(f"✅ Launched {total_agents} agents successfully")
     
@@ -635,12 +709,8 @@ Let me begin by reading my instructions now."""
             
             # Check window responsiveness
             try:
-                result = subprocess.run([
-                    'tmux', 'capture-pane', '-t', 
-                    f'{self.session_name}:{agent.window}', '-p'
-                ], capture_output=True, text=True)
-                
-                last_output = result.stdout.strip()
+                capture_argv = agent.capture_argv or self.pane_capture_argv(agent.window)
+                last_output = self.run_capture(capture_argv, timeout=5).strip()
                 
                 # Check for error patterns
                 error_patterns = [
@@ -648,10 +718,15 @@ Let me begin by reading my instructions now."""
                     'Traceback', 'Claude Code has stopped'
                 ]
                 
-                for pattern in error_patterns:
-                    if pattern in last_output:
-                        health['issues'].append(f'Error detected: {pattern}')
-                        agent.error_count += 1
+                detected = [pattern for pattern in error_patterns if pattern in last_output]
+                for pattern in detected:
+                    health['issues'].append(f'Error detected: {pattern}')
+                
+                # The monitoring thread is the only writer for a published
+                # agent (launch_agent's increment happens before the agent is
+                # stored), so a single store per check is enough - no lock
+                if detected:
+                    agent.error_count += len(detected)
                 
             except Exception as e:
                 logger.error(f"Failed to capture pane for {agent_id}: {e}")
@@ -710,6 +785,10 @@ Let me begin by reading my instructions now."""
             try:
                 # Check each agent
                 for agent_id, agent in list(self.agents.items()):
+                    # Don't make shutdown wait for every remaining pane capture
+                    if self.stop_event.is_set():
+                        break
+                    
                     if agent.state == AgentState.STOPPED:
                         continue
                     
@@ -725,7 +804,7 @@ Let me begin by reading my instructions now."""
                     
                     # Log metrics periodically
                     if health['metrics']:
-                        logger.debug(f"Agent {agent_id} metrics: {health['metrics']}")
+                        logger.debug("Agent %s metrics: %s", agent_id, health['metrics'])
                 
                 # Save state periodically
                 if int(time.time()) % 300 == 0:  # Every 5 minutes
@@ -760,34 +839,42 @@ Let me begin by reading my instructions now."""
     
     def show_dashboard(self):
         """Display system status dashboard"""
-        print("\n" + "="*60)
-        print("🤖 AUTONOMOUS MULTI-AGENT SYSTEM DASHBOARD")
-        print("="*60)
+        # Render into one buffer and write it in a single call so the
+        # dashboard doesn't cost a syscall per line or interleave with logs
+        lines = [
+            "",
+            "="*60,
+            "🤖 AUTONOMOUS MULTI-AGENT SYSTEM DASHBOARD",
+            "="*60,
+        ]
         
         # System info
-        print(f"\n📊 System Status:")
-        print(f"   Uptime: {self.get_system_uptime()}")
-        print(f"   Total Agents: {len(self.agents)}")
-        print(f"   Active: {sum(1 for a in self.agents.values() if a.state == AgentState.RUNNING)}")
-        print(f"   Errors: {sum(1 for a in self.agents.values() if a.state == AgentState.ERROR)}")
+        lines.append("\n📊 System Status:")
+        lines.append(f"   Uptime: {self.get_system_uptime()}")
+        lines.append(f"   Total Agents: {len(self.agents)}")
+        lines.append(f"   Active: {sum(1 for a in self.agents.values() if a.state == AgentState.RUNNING)}")
+        lines.append(f"   Errors: {sum(1 for a in self.agents.values() if a.state == AgentState.ERROR)}")
         
         # Agent details
-        print(f"\n👥 Agent Status:")
+        lines.append("\n👥 Agent Status:")
         for agent_id, agent in self.agents.items():
             status_icon = "🟢" if agent.state == AgentState.RUNNING else "🔴"
-            print(f"   {status_icon} {agent_id}")
-            print(f"      State: {agent.state.value}")
-            print(f"      Memory: {agent.memory_usage:.1f}MB")
-            print(f"      CPU: {agent.cpu_usage:.1f}%")
-            print(f"      Errors: {agent.error_count}")
+            lines.append(f"   {status_icon} {agent_id}")
+            lines.append(f"      State: {agent.state.value}")
+            lines.append(f"      Memory: {agent.memory_usage:.1f}MB")
+            lines.append(f"      CPU: {agent.cpu_usage:.1f}%")
+            lines.append(f"      Errors: {agent.error_count}")
         
         # Instructions
-        print(f"\n📚 Commands:")
-        print(f"   View agents: tmux attach -t {self.session_name}")
-        print(f"   Switch agents: Ctrl+B, then window number")
-        print(f"   Stop system: Ctrl+C or ./stop.sh")
-        print(f"   View logs: tail -f autonomous-system.log")
-        print("="*60 + "\n")
+        lines.append("\n📚 Commands:")
+        lines.append(f"   View agents: tmux attach -t {self.session_name}")
+        lines.append("   Switch agents: Ctrl+B, then window number")
+        lines.append("   Stop system: Ctrl+C or ./stop.sh")
+        lines.append("   View logs: tail -f autonomous-system.log")
+        lines.append("="*60 + "\n")
+        
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
     
     def run(self):
         """Main execution flow"""
@@ -819,8 +906,10 @@ Let me begin by reading my instructions now."""
         
         try:
             while not self.stop_event.is_set():
-                # Refresh dashboard periodically
-                time.sleep(30)
+                # Refresh dashboard periodically; a signal sets the event and
+                # wakes us immediately instead of after the full interval
+                if self.stop_event.wait(timeout=30):
+                    break
                 os.system('clear' if os.name == 'posix' else 'cls')
                 self.show_dashboard()
                 
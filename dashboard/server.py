@@ -3,23 +3,44 @@
 Simple Web Dashboard for Autonomous Agent Monitoring
 """
 
+import argparse
+import importlib.util
 import json
+import os
+import sys
 import asyncio
+import hashlib
+import heapq
+import mmap
+import threading
+import time
 from pathlib import Path
 from datetime import datetime
 import subprocess
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional, Tuple
 
 try:
-    from flask import Flask, render_template_string, jsonify
+    from flask import Flask, jsonify, Response, request
     from flask_cors import CORS
 except ImportError:
     print("Flask not installed. Install with: pip install flask flask-cors")
     print("Dashboard is optional - the system works without it.")
     exit(0)
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
+
 app = Flask(__name__)
 CORS(app)
+if Compress is not None:
+    Compress(app)
 
 # Dashboard HTML template
 DASHBOARD_HTML = '''
@@ -181,14 +202,14 @@ DASHBOARD_HTML = '''
         </div>
         
         <div class="grid">
-            <div class="card">
+            <div class="card" data-kind="tasks">
                 <h3>Recent Tasks</h3>
                 <div class="task-list" id="recent-tasks">
                     <p>Loading...</p>
                 </div>
             </div>
             
-            <div class="card">
+            <div class="card" data-kind="findings">
                 <h3>Recent Findings</h3>
                 <div class="task-list" id="recent-findings">
                     <p>Loading...</p>
@@ -196,78 +217,325 @@ DASHBOARD_HTML = '''
             </div>
         </div>
         
-        <button class="refresh-btn" onclick="refreshData()">🔄 Refresh</button>
+        <button class="refresh-btn" onclick="refreshAll()">🔄 Refresh</button>
         <span class="timestamp" style="margin-left: 10px;">Last updated: <span id="last-update">Never</span></span>
     </div>
     
     <script>
-        async function refreshData() {
+        // DOM references, looked up once
+        const els = {
+            tmuxStatus: document.getElementById('tmux-status'),
+            uptime: document.getElementById('uptime'),
+            lastUpdate: document.getElementById('last-update'),
+            recent: {
+                tasks: document.getElementById('recent-tasks'),
+                findings: document.getElementById('recent-findings')
+            }
+        };
+        const counterEls = {
+            active_agents: document.getElementById('active-agents'),
+            pending_tasks: document.getElementById('pending-tasks'),
+            in_progress_tasks: document.getElementById('progress-tasks'),
+            completed_tasks: document.getElementById('completed-tasks'),
+            total_findings: document.getElementById('total-findings'),
+            critical_findings: document.getElementById('critical-findings'),
+            high_findings: document.getElementById('high-findings')
+        };
+        
+        // Recent-item lists currently scrolled into view
+        const visibleKinds = new Set();
+        
+        function el(tag, className, text) {
+            const node = document.createElement(tag);
+            if (className) node.className = className;
+            if (text !== undefined) node.textContent = text;
+            return node;
+        }
+        
+        const itemBuilders = {
+            tasks: task => {
+                const item = el('div', 'task-item');
+                item.append(
+                    el('strong', '', `${task.type}: ${task.description}`), el('br'),
+                    el('span', `status ${task.status}`, task.status), ' ',
+                    el('span', 'timestamp', new Date(task.created_at).toLocaleString())
+                );
+                return item;
+            },
+            findings: finding => {
+                const item = el('div', `finding-item severity-${finding.severity}`);
+                item.append(
+                    el('strong', '', finding.title), el('br'),
+                    el('span', 'timestamp', finding.file_path || 'General')
+                );
+                return item;
+            }
+        };
+        
+        // Build the list off-document; text goes through textContent, never parsed as HTML
+        function buildList(kind, items) {
+            const frag = document.createDocumentFragment();
+            if (items.length === 0) {
+                frag.append(el('p', '', `No recent ${kind}`));
+            }
+            for (const item of items) {
+                frag.append(itemBuilders[kind](item));
+            }
+            return frag;
+        }
+        
+        // Apply a refresh's results to the page in a single flush
+        function render(summary, recent) {
+            const lists = {};
+            for (const kind of Object.keys(recent || {})) {
+                lists[kind] = buildList(kind, recent[kind]);
+            }
+            
+            queueMicrotask(() => {
+                if (summary) {
+                    Object.assign(els.tmuxStatus, {
+                        textContent: summary.tmux_active ? 'Active' : 'Inactive',
+                        className: 'status ' + (summary.tmux_active ? 'active' : 'inactive')
+                    });
+                    els.uptime.textContent = summary.uptime || '--:--:--';
+                    for (const [key, node] of Object.entries(counterEls)) {
+                        node.textContent = summary[key];
+                    }
+                }
+                for (const [kind, frag] of Object.entries(lists)) {
+                    els.recent[kind].replaceChildren(frag);
+                }
+                els.lastUpdate.textContent = new Date().toLocaleString();
+            });
+        }
+        
+        // ETag of the last body we rendered, per URL
+        const etags = {};
+        
+        // Resolves to the parsed body, or null when the server says nothing changed
+        async function fetchJson(url) {
+            const headers = etags[url] ? {'If-None-Match': etags[url]} : {};
+            const response = await fetch(url, {cache: 'no-store', headers});
+            if (response.status === 304) return null;
+            
+            // The recent-list URLs overlap, so a new body for one invalidates the others
+            if (url.startsWith('/api/recent')) {
+                Object.keys(etags).filter(key => key.startsWith('/api/recent'))
+                    .forEach(key => delete etags[key]);
+            }
+            etags[url] = response.headers.get('ETag');
+            return response.json();
+        }
+        
+        // Fetch the recent lists for the given kinds in one request
+        function fetchRecent(kinds) {
+            if (kinds.length === 0) return Promise.resolve(null);
+            const url = kinds.length === 1 ? '/api/recent?kind=' + kinds[0] : '/api/recent';
+            return fetchJson(url).then(data => 
+                data === null || kinds.length > 1 ? data : {[kinds[0]]: data});
+        }
+        
+        // Resolves to true when anything on the page changed
+        async function refresh(kinds, withSummary = true) {
             try {
-                const response = await fetch('/api/status');
-                const data = await response.json();
-                
-                // Update system status
-                document.getElementById('tmux-status').textContent = data.tmux_active ? 'Active' : 'Inactive';
-                document.getElementById('tmux-status').className = 'status ' + (data.tmux_active ? 'active' : 'inactive');
-                document.getElementById('active-agents').textContent = data.active_agents;
-                document.getElementById('uptime').textContent = data.uptime || '--:--:--';
-                
-                // Update task counts
-                document.getElementById('pending-tasks').textContent = data.pending_tasks;
-                document.getElementById('progress-tasks').textContent = data.in_progress_tasks;
-                document.getElementById('completed-tasks').textContent = data.completed_tasks;
-                
-                // Update findings counts
-                document.getElementById('total-findings').textContent = data.total_findings;
-                document.getElementById('critical-findings').textContent = data.critical_findings;
-                document.getElementById('high-findings').textContent = data.high_findings;
-                
-                // Update recent tasks
-                const tasksHtml = data.recent_tasks.map(task => `
-                    <div class="task-item">
-                        <strong>${task.type}: ${task.description}</strong><br>
-                        <span class="status ${task.status}">${task.status}</span>
-                        <span class="timestamp">${new Date(task.created_at).toLocaleString()}</span>
-                    </div>
-                `).join('') || '<p>No recent tasks</p>';
-                document.getElementById('recent-tasks').innerHTML = tasksHtml;
-                
-                // Update recent findings
-                const findingsHtml = data.recent_findings.map(finding => `
-                    <div class="finding-item severity-${finding.severity}">
-                        <strong>${finding.title}</strong><br>
-                        <span class="timestamp">${finding.file_path || 'General'}</span>
-                    </div>
-                `).join('') || '<p>No recent findings</p>';
-                document.getElementById('recent-findings').innerHTML = findingsHtml;
-                
-                // Update timestamp
-                document.getElementById('last-update').textContent = new Date().toLocaleString();
-                
+                const [summary, recent] = await Promise.all([
+                    withSummary ? fetchJson('/api/summary') : null,
+                    fetchRecent(kinds)
+                ]);
+                render(summary, recent);
+                return summary !== null || recent !== null;
             } catch (error) {
                 console.error('Failed to refresh data:', error);
+                return false;
+            }
+        }
+        
+        // Poll the counters, plus whichever lists are on screen
+        function refreshData() {
+            return refresh(Array.from(visibleKinds));
+        }
+        
+        // Manual refresh reloads everything
+        function refreshAll() {
+            return refresh(['tasks', 'findings']);
+        }
+        
+        // Only fetch a recent-items list while its card is visible
+        const observer = new IntersectionObserver(entries => {
+            const appeared = [];
+            entries.forEach(entry => {
+                const kind = entry.target.dataset.kind;
+                if (entry.isIntersecting) {
+                    if (!visibleKinds.has(kind)) {
+                        visibleKinds.add(kind);
+                        appeared.push(kind);
+                    }
+                } else {
+                    visibleKinds.delete(kind);
+                }
+            });
+            if (appeared.length) refresh(appeared, false);
+        });
+        document.querySelectorAll('.card[data-kind]').forEach(card => observer.observe(card));
+        
+        // Auto-refresh only while the tab is visible: every 10 seconds, backing
+        // off to once a minute while nothing changes
+        const BASE_DELAY = 10000;
+        const MAX_DELAY = 60000;
+        let delay = BASE_DELAY;
+        let timer = null;
+        let generation = 0;
+        
+        async function poll() {
+            const current = generation;
+            const changed = await refreshData();
+            if (current !== generation) return;  // stopped while the request was in flight
+            
+            delay = changed ? BASE_DELAY : Math.min(delay * 2, MAX_DELAY);
+            timer = setTimeout(poll, delay);
+        }
+        
+        function startPolling() {
+            if (timer === null) {
+                delay = BASE_DELAY;
+                timer = setTimeout(poll, delay);
             }
         }
         
-        // Auto-refresh every 10 seconds
-        setInterval(refreshData, 10000);
+        function stopPolling() {
+            clearTimeout(timer);
+            timer = null;
+            generation++;
+        }
+        
+        document.addEventListener('visibilitychange', () => {
+            if (document.hidden) {
+                stopPolling();
+            } else {
+                // Catch up straight away after being in the background
+                refreshData();
+                startPolling();
+            }
+        });
+        
+        if (!document.hidden) {
+            startPolling();
+        }
         
         // Initial load
-        refreshData();
+        refresh([]);
     </script>
 </body>
 </html>
 '''
 
+# The page has no template variables - encode it once and let browsers revalidate
+DASHBOARD_BYTES = DASHBOARD_HTML.encode('utf-8')
+DASHBOARD_ETAG = hashlib.md5(DASHBOARD_BYTES).hexdigest()
+
+# Lists served by /api/recent
+RECENT_KINDS = ('tasks', 'findings')
+
+def dumps_bytes(obj) -> bytes:
+    """Compact JSON encoding, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+def load_json_file(path: Path):
+    """Parse a JSON file, using orjson when it is installed
+    
+    With orjson the file is parsed straight out of a read-only memory map,
+    so the page cache backs the parse instead of a copy of the whole file.
+    """
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            # mmap can't map an empty file
+            if os.fstat(f.fileno()).st_size == 0:
+                return orjson.loads(b'')
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # Release the view before the map closes
+                with memoryview(mm) as view:
+                    return orjson.loads(view)
+    with open(path, 'r') as f:
+        return json.load(f)
+
 class DashboardServer:
     def __init__(self):
         self.base_dir = Path(__file__).parent.parent
         self.state_file = self.base_dir / "mcp-coordinator" / "state.json"
+        
+        # Serialized API responses shared by every client polling within the TTL
+        self.status_ttl = 1.5  # seconds
+        self._payloads: Dict[str, Tuple[float, bytes, str]] = {}
+        self._payload_lock = threading.Lock()
+        
+        # Last tmux has-session result, so we don't fork tmux on every poll
+        self.tmux_ttl = 5.0  # seconds
+        self._tmux_cached = (float('-inf'), False)
+        
+        # Parsed state.json summary, keyed on the file's mtime
+        self._state_status: Optional[Dict] = None
+        self._state_mtime: Optional[int] = None
+    
+    def _cached_payload(self, key: str, build: Callable) -> Tuple[bytes, str]:
+        """Get a response as JSON bytes plus its ETag, rebuilt at most once per TTL window"""
+        cached = self._payloads.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.status_ttl:
+            return cached[1], cached[2]
+        
+        with self._payload_lock:
+            # Another request may have refreshed it while we waited
+            cached = self._payloads.get(key)
+            if cached is not None and time.monotonic() - cached[0] < self.status_ttl:
+                return cached[1], cached[2]
+            
+            payload = dumps_bytes(build())
+            etag = hashlib.md5(payload).hexdigest()
+            self._payloads[key] = (time.monotonic(), payload, etag)
+            return payload, etag
+    
+    def get_status_payload(self) -> Tuple[bytes, str]:
+        """Get the full status as JSON bytes plus ETag"""
+        return self._cached_payload('status', self.get_status)
+    
+    def get_summary_payload(self) -> Tuple[bytes, str]:
+        """Get the counters as JSON bytes plus ETag"""
+        return self._cached_payload('summary', self.get_summary)
+    
+    def get_recent_payload(self, kind: Optional[str] = None) -> Tuple[bytes, str]:
+        """Get one recent-items list, or all of them keyed by kind, as JSON bytes plus ETag"""
+        if kind is None:
+            return self._cached_payload('recent', 
+                                        lambda: {k: self.get_recent(k) for k in RECENT_KINDS})
+        return self._cached_payload(f'recent:{kind}', lambda: self.get_recent(kind))
     
     def get_status(self) -> Dict:
         """Get current system status"""
+        status = {'tmux_active': self.check_tmux_session()}
+        status.update(self.get_state_status())
+        return status
+    
+    def get_summary(self) -> Dict:
+        """Get the status counters without the recent-item lists"""
+        return {k: v for k, v in self.get_status().items() 
+                if not k.startswith('recent_')}
+    
+    def get_recent(self, kind: str, limit: int = 5) -> List[Dict]:
+        """Get the most recent tasks or findings"""
+        return self.get_state_status()[f'recent_{kind}'][:limit]
+    
+    def get_state_status(self) -> Dict:
+        """Get the state.json-derived part of the status, re-parsed only when the file changes"""
+        try:
+            mtime = os.stat(self.state_file).st_mtime_ns
+        except OSError:
+            mtime = None
+        
+        if self._state_status is not None and mtime == self._state_mtime:
+            return self._state_status
+        
         status = {
-            'tmux_active': self.check_tmux_session(),
             'active_agents': 0,
             'uptime': None,
             'pending_tasks': 0,
@@ -281,70 +549,161 @@ class DashboardServer:
         }
         
         # Load state file
-        if self.state_file.exists():
+        if mtime is not None:
             try:
-                with open(self.state_file, 'r') as f:
-                    state = json.load(f)
+                state = load_json_file(self.state_file)
+                
+                # Newer coordinators precompute everything we need on save
+                summary = state.get('summary')
+                if isinstance(summary, dict):
+                    status.update({k: summary[k] for k in status if k in summary})
+                    self._state_status = status
+                    self._state_mtime = mtime
+                    return status
                 
                 # Count agents
                 status['active_agents'] = len([a for a in state.get('agents', {}).values() 
                                              if a.get('status') == 'active'])
                 
-                # Count tasks
+                # Count tasks in a single pass
                 tasks = state.get('task_queue', [])
-                status['pending_tasks'] = len([t for t in tasks if t['status'] == 'pending'])
-                status['in_progress_tasks'] = len([t for t in tasks if t['status'] == 'in_progress'])
-                status['completed_tasks'] = len([t for t in tasks if t['status'] == 'completed'])
+                pending = in_progress = completed = 0
+                for task in tasks:
+                    task_status = task.get('status')
+                    if task_status == 'pending':
+                        pending += 1
+                    elif task_status == 'in_progress':
+                        in_progress += 1
+                    elif task_status == 'completed':
+                        completed += 1
+                status['pending_tasks'] = pending
+                status['in_progress_tasks'] = in_progress
+                status['completed_tasks'] = completed
                 
                 # Get recent tasks
-                status['recent_tasks'] = sorted(tasks, 
-                                              key=lambda x: x.get('created_at', ''), 
-                                              reverse=True)[:5]
+                status['recent_tasks'] = heapq.nlargest(5, tasks, 
+                                                        key=lambda x: x.get('created_at', ''))
                 
-                # Count findings
+                # Count findings in a single pass
                 findings = state.get('audit_findings', [])
+                critical = high = 0
+                for finding in findings:
+                    severity = finding.get('severity')
+                    if severity == 'critical':
+                        critical += 1
+                    elif severity == 'high':
+                        high += 1
                 status['total_findings'] = len(findings)
-                status['critical_findings'] = len([f for f in findings if f.get('severity') == 'critical'])
-                status['high_findings'] = len([f for f in findings if f.get('severity') == 'high'])
+                status['critical_findings'] = critical
+                status['high_findings'] = high
                 
                 # Get recent findings
-                status['recent_findings'] = sorted(findings, 
-                                                 key=lambda x: x.get('submitted_at', ''), 
-                                                 reverse=True)[:5]
+                status['recent_findings'] = heapq.nlargest(5, findings, 
+                                                           key=lambda x: x.get('submitted_at', ''))
                 
             except Exception as e:
+                # Don't cache a failed read (e.g. a write in progress) - retry next poll
                 print(f"Error reading state file: {e}")
+                return status
         
+        self._state_status = status
+        self._state_mtime = mtime
         return status
     
     def check_tmux_session(self) -> bool:
-        """Check if tmux session is active"""
+        """Check if tmux session is active (memoized for a few seconds)"""
+        checked_at, active = self._tmux_cached
+        now = time.monotonic()
+        if now - checked_at < self.tmux_ttl:
+            return active
+        
         try:
             result = subprocess.run(['tmux', 'has-session', '-t', 'autonomous-claude'], 
-                                  capture_output=True)
-            return result.returncode == 0
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            active = result.returncode == 0
         except:
-            return False
+            active = False
+        
+        self._tmux_cached = (now, active)
+        return active
 
 dashboard = DashboardServer()
 
 @app.route('/')
 def index():
     """Serve the dashboard HTML"""
-    return render_template_string(DASHBOARD_HTML)
+    response = Response(DASHBOARD_BYTES, mimetype='text/html')
+    response.set_etag(DASHBOARD_ETAG)
+    response.headers['Cache-Control'] = 'public, max-age=60'
+    return response.make_conditional(request)
+
+def json_response(payload: bytes, etag: str) -> Response:
+    """Wrap a cached JSON payload, answering 304 when the client's copy is current"""
+    response = Response(payload, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
 
 @app.route('/api/status')
 def api_status():
     """Get current status as JSON"""
-    return jsonify(dashboard.get_status())
+    return json_response(*dashboard.get_status_payload())
+
+@app.route('/api/summary')
+def api_summary():
+    """Get the status counters as JSON"""
+    return json_response(*dashboard.get_summary_payload())
+
+@app.route('/api/recent')
+def api_recent():
+    """Get recent tasks or findings (both when no kind is given) as JSON"""
+    kind = request.args.get('kind')
+    if kind is not None and kind not in RECENT_KINDS:
+        return jsonify({'error': f"kind must be one of: {', '.join(RECENT_KINDS)}"}), 400
+    return json_response(*dashboard.get_recent_payload(kind))
 
 def main():
     """Run the dashboard server"""
+    parser = argparse.ArgumentParser(description="Autonomous agent monitoring dashboard")
+    parser.add_argument('--dev', action='store_true', 
+                        help="use the Flask development server even if a production server is installed")
+    parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1), 
+                        help="worker processes when running under gunicorn")
+    args = parser.parse_args()
+    
     print("🌐 Starting dashboard server...")
     print("📊 Dashboard available at: http://localhost:5000")
     print("Press Ctrl+C to stop")
     
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    # Listen on loopback only; put a reverse proxy in front for remote
+    # access (see SETUP_GUIDE.md)
+    host, port = '127.0.0.1', 5000
+    
+    # Prefer a production server when installed: gunicorn with several
+    # worker processes, then waitress in-process. The Werkzeug dev server
+    # is only a fallback
+    if not args.dev:
+        if importlib.util.find_spec('gunicorn') is not None:
+            # gunicorn forks its own workers, so hand the process over to it
+            sys.stdout.flush()
+            os.execv(sys.executable, [
+                sys.executable, '-m', 'gunicorn',
+                '--chdir', str(Path(__file__).parent),
+                '--workers', str(args.workers),
+                '--worker-class', 'gthread', '--threads', '4',
+                '--bind', f'{host}:{port}',
+                'server:app'
+            ])
+        
+        try:
+            from waitress import serve
+        except ImportError:
+            pass
+        else:
+            serve(app, host=host, port=port, threads=8)
+            return
+    
+    app.run(host=host, port=port, debug=False, threaded=True)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
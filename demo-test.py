@@ -4,85 +4,194 @@ Demo Test - Simulates the MCP+RAG system functionality
 Shows how the system would work with all dependencies installed
 """
 
+import argparse
+import asyncio
 import json
+import sys
 import time
+from collections import Counter, defaultdict, deque
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
+from typing import Dict, List, Optional
 import random
 
+# Slotted records where supported (dataclass slots= needs Python 3.10)
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+# Task types each role can pick up, in order of preference
+ROLE_TASK_TYPES = {
+    'planner': ['plan'],
+    'coder': ['implement', 'fix'],
+    'tester': ['test'],
+    'reviewer': ['review']
+}
+
+@dataclass(**_SLOTS)
+class Agent:
+    """A registered agent"""
+    id: str
+    role: str
+    capabilities: List[str]
+    status: str = 'active'
+    registered_at: str = ''
+
+@dataclass(**_SLOTS)
+class Finding:
+    """An audit finding"""
+    title: str
+    description: str
+    severity: str
+    category: str
+    file_path: Optional[str] = None
+    line_number: Optional[int] = None
+    id: str = ''
+    submitted_at: str = ''
+
+@dataclass(**_SLOTS)
+class Task:
+    """A unit of work in the queue"""
+    type: str
+    description: str
+    priority: str
+    id: str = ''
+    status: str = 'pending'
+    finding_id: Optional[str] = None
+    assigned_to: Optional[str] = None
+    result: Optional[Dict] = None
+    plan: Optional[Dict] = None
+
 class DemoMCPCoordinator:
     """Simulated MCP Coordinator for demonstration"""
     
     def __init__(self):
         self.agents = {}
-        self.task_queue = []
+        self.tasks_by_id = {}
+        self.pending_by_type = defaultdict(deque)
+        self.status_counts = Counter()
+        self.assigned_by_agent = defaultdict(set)
         self.audit_findings = []
         self.task_counter = 0
         self.finding_counter = 0
         
     def register_agent(self, agent_id: str, role: str, capabilities: list):
         """Register an agent"""
-        self.agents[agent_id] = {
-            'id': agent_id,
-            'role': role,
-            'capabilities': capabilities,
-            'status': 'active',
-            'registered_at': datetime.now().isoformat()
-        }
-        return self.agents[agent_id]
+        agent = Agent(agent_id, role, capabilities, 
+                      registered_at=datetime.now().isoformat())
+        self.agents[agent_id] = agent
+        return agent
     
     def submit_audit_finding(self, finding: dict):
         """Submit an audit finding"""
         self.finding_counter += 1
-        finding['id'] = f"finding-{self.finding_counter}"
-        finding['submitted_at'] = datetime.now().isoformat()
+        finding = Finding(**finding, 
+                          id=f"finding-{self.finding_counter}",
+                          submitted_at=datetime.now().isoformat())
         self.audit_findings.append(finding)
         
         # Auto-create planning task
-        self.task_counter += 1
-        task = {
-            'id': f"task-{self.task_counter}",
-            'type': 'plan',
-            'description': f"Create plan for: {finding['title']}",
-            'priority': finding['severity'],
-            'status': 'pending',
-            'finding_id': finding['id']
-        }
-        self.task_queue.append(task)
+        self.add_task(Task(
+            type='plan',
+            description=f"Create plan for: {finding.title}",
+            priority=finding.severity,
+            finding_id=finding.id
+        ))
         
         return finding
     
+    def add_task(self, task: Task):
+        """Queue a new pending task"""
+        self.task_counter += 1
+        task.id = f"task-{self.task_counter}"
+        task.status = 'pending'
+        self.tasks_by_id[task.id] = task
+        self.pending_by_type[task.type].append(task)
+        self.status_counts['pending'] += 1
+        return task
+    
     def get_next_task(self, agent_id: str, role: str):
         """Get next suitable task for agent"""
-        for task in self.task_queue:
-            if task['status'] == 'pending' and self._is_suitable(task, role):
-                task['status'] = 'in_progress'
-                task['assigned_to'] = agent_id
+        for task_type in ROLE_TASK_TYPES.get(role, []):
+            pending = self.pending_by_type[task_type]
+            if pending:
+                task = pending.popleft()
+                self._set_status(task, 'in_progress')
+                task.assigned_to = agent_id
+                self.assigned_by_agent[agent_id].add(task.id)
                 return task
         return None
     
-    def _is_suitable(self, task, role):
-        """Check if task is suitable for role"""
-        role_mapping = {
-            'planner': ['plan'],
-            'coder': ['implement', 'fix'],
-            'tester': ['test'],
-            'reviewer': ['review']
-        }
-        return task['type'] in role_mapping.get(role, [])
+    def claim_tasks(self, agent_id: str, role: str) -> List[Task]:
+        """Claim every task currently pending for a role"""
+        claimed = []
+        while True:
+            task = self.get_next_task(agent_id, role)
+            if task is None:
+                return claimed
+            claimed.append(task)
+    
+    def _set_status(self, task, status):
+        """Move a task to a new status, keeping the counts in step"""
+        self.status_counts[task.status] -= 1
+        task.status = status
+        self.status_counts[status] += 1
     
     def update_task(self, task_id: str, status: str, result=None):
         """Update task status"""
-        for task in self.task_queue:
-            if task['id'] == task_id:
-                task['status'] = status
-                if result:
-                    task['result'] = result
-                return task
-        return None
+        task = self.tasks_by_id.get(task_id)
+        if task is None:
+            return None
+        self._set_status(task, status)
+        if result:
+            task.result = result
+        return task
 
-def run_demo():
-    """Run a demonstration of the system"""
+def pause(seconds: float):
+    """Sleep between demo steps, only when pacing is requested"""
+    if seconds:
+        time.sleep(seconds)
+
+async def plan_task(coordinator: DemoMCPCoordinator, task: Task, pace: float) -> Dict:
+    """Plan one task and queue its implementation task"""
+    print(f"📝 Planning: {task.description}")
+    if pace:
+        await asyncio.sleep(pace * 2)
+    
+    # Simulate planning
+    plan = {
+        'steps': [
+            'Analyze current implementation',
+            'Design secure solution',
+            'Implement fixes',
+            'Add comprehensive tests',
+            'Update documentation'
+        ],
+        'estimated_hours': random.randint(2, 8)
+    }
+    
+    coordinator.update_task(task.id, 'completed', plan)
+    
+    # Create implementation tasks
+    coordinator.add_task(Task(
+        type='implement',
+        description=f"Implement fix for: {task.description}",
+        priority=task.priority,
+        plan=plan
+    ))
+    
+    print(f"✅ Plan created with {len(plan['steps'])} steps")
+    return plan
+
+async def plan_tasks(coordinator: DemoMCPCoordinator, tasks: List[Task], pace: float) -> List[Dict]:
+    """Plan independent tasks concurrently"""
+    return await asyncio.gather(*(plan_task(coordinator, task, pace) for task in tasks))
+
+def run_demo(pace: float = 0.0):
+    """Run a demonstration of the system
+    
+    pace is the delay in seconds between demo steps (planning steps take
+    twice as long); 0 runs the demo straight through.
+    """
     print("🎭 MCP+RAG System Demonstration")
     print("="*50)
     print("This demo simulates how the system works\n")
@@ -105,7 +214,7 @@ def run_demo():
     for agent_id, role, capabilities in agents:
         agent = coordinator.register_agent(agent_id, role, capabilities)
         print(f"✅ Registered {role}: {agent_id}")
-        time.sleep(0.5)
+        pause(pace)
     
     print(f"\nTotal agents registered: {len(coordinator.agents)}")
     
@@ -143,54 +252,20 @@ def run_demo():
     for finding in findings:
         result = coordinator.submit_audit_finding(finding)
         print(f"🔍 Found: {finding['title']} ({finding['severity']})")
-        time.sleep(0.5)
+        pause(pace)
     
     print(f"\nTotal findings: {len(coordinator.audit_findings)}")
-    print(f"Tasks created: {len(coordinator.task_queue)}")
+    print(f"Tasks created: {len(coordinator.tasks_by_id)}")
     
     # Phase 3: Planner creates plans
     print("\n📋 Phase 3: Planner Creates Implementation Plans")
     print("-"*30)
     
     planner_id = "planner-001"
-    plans_created = 0
     
-    while True:
-        task = coordinator.get_next_task(planner_id, "planner")
-        if not task:
-            break
-        
-        print(f"📝 Planning: {task['description']}")
-        time.sleep(1)
-        
-        # Simulate planning
-        plan = {
-            'steps': [
-                'Analyze current implementation',
-                'Design secure solution',
-                'Implement fixes',
-                'Add comprehensive tests',
-                'Update documentation'
-            ],
-            'estimated_hours': random.randint(2, 8)
-        }
-        
-        coordinator.update_task(task['id'], 'completed', plan)
-        
-        # Create implementation tasks
-        coordinator.task_counter += 1
-        impl_task = {
-            'id': f"task-{coordinator.task_counter}",
-            'type': 'implement',
-            'description': f"Implement fix for: {task['description']}",
-            'priority': task['priority'],
-            'status': 'pending',
-            'plan': plan
-        }
-        coordinator.task_queue.append(impl_task)
-        
-        plans_created += 1
-        print(f"✅ Plan created with {len(plan['steps'])} steps")
+    # Plans don't depend on each other, so work on all of them at once
+    tasks = coordinator.claim_tasks(planner_id, "planner")
+    plans_created = len(asyncio.run(plan_tasks(coordinator, tasks, pace)))
     
     print(f"\nPlans created: {plans_created}")
     
@@ -198,31 +273,23 @@ def run_demo():
     print("\n📋 Phase 4: System Status")
     print("-"*30)
     
-    # Count task statuses
-    status_count = {}
-    for task in coordinator.task_queue:
-        status = task['status']
-        status_count[status] = status_count.get(status, 0) + 1
-    
     print("Task Queue Status:")
-    for status, count in status_count.items():
-        print(f"  {status}: {count}")
+    for status, count in coordinator.status_counts.items():
+        if count:
+            print(f"  {status}: {count}")
     
     print("\nAgent Status:")
     for agent_id, agent in coordinator.agents.items():
-        assigned_tasks = sum(1 for t in coordinator.task_queue 
-                           if t.get('assigned_to') == agent_id)
-        print(f"  {agent['role']}: {agent_id} - {assigned_tasks} tasks")
+        assigned_tasks = len(coordinator.assigned_by_agent[agent_id])
+        print(f"  {agent.role}: {agent_id} - {assigned_tasks} tasks")
     
     # Phase 5: Demonstrate RAG features
     print("\n📋 Phase 5: RAG Intelligence Features")
     print("-"*30)
     
     # Pattern recognition
-    patterns = {}
-    for finding in coordinator.audit_findings:
-        pattern = f"{finding['category']}:{finding['severity']}"
-        patterns[pattern] = patterns.get(pattern, 0) + 1
+    patterns = Counter(f"{finding.category}:{finding.severity}" 
+                       for finding in coordinator.audit_findings)
     
     print("Pattern Recognition:")
     for pattern, count in patterns.items():
@@ -237,7 +304,7 @@ def run_demo():
     }
     
     similar = [f for f in coordinator.audit_findings 
-               if f['category'] == test_finding['category']]
+               if f.category == test_finding['category']]
     
     if similar:
         print(f"  Found {len(similar)} similar security issues")
@@ -246,7 +313,7 @@ def run_demo():
     # Performance metrics
     print("\nPerformance Metrics:")
     print(f"  Findings processed: {len(coordinator.audit_findings)}")
-    print(f"  Tasks created: {len(coordinator.task_queue)}")
+    print(f"  Tasks created: {len(coordinator.tasks_by_id)}")
     print(f"  Avg response time: {random.uniform(0.1, 0.5):.2f}s")
     
     print("\n✨ Demo Complete!")
@@ -259,4 +326,8 @@ def run_demo():
     print("- RAG would provide intelligent context")
 
 if __name__ == "__main__":
-    run_demo()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="MCP+RAG system demonstration")
+    parser.add_argument('--pace', type=float, default=0.0,
+                        help="seconds to pause between steps for readability (0.5 for a live walkthrough)")
+    args = parser.parse_args()
+    run_demo(pace=args.pace)
\ No newline at end of file
@@ -9,17 +9,37 @@ import logging
 import asyncio
 import uuid
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Set
+from typing import Dict, FrozenSet, List, Optional, Any, Set, Tuple
 from pathlib import Path
 import subprocess
 import os
+import shutil
 import sys
 import traceback
-from collections import defaultdict, deque
+from collections import Counter, defaultdict, deque
+from itertools import islice
 from dataclasses import dataclass, asdict
 from enum import Enum
 import time
+import threading
 import hashlib
+import heapq
+import re
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
 
 # MCP SDK imports
 import mcp.types as types
@@ -38,6 +58,62 @@ logging.basicConfig(
 )
 logger = logging.getLogger("mcp-coordinator-v2")
 
+def dumps_bytes(obj, indent: bool = False) -> bytes:
+    """JSON encoding, compact unless indent is set, using orjson when it is installed"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    if indent:
+        return json.dumps(obj, indent=2).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+def finding_digest(key: bytes) -> str:
+    """Non-cryptographic digest for finding deduplication"""
+    if xxhash is not None:
+        return xxhash.xxh3_64_hexdigest(key)
+    return hashlib.blake2b(key, digest_size=16).hexdigest()
+
+def loads_json(data):
+    """Parse JSON text or bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def acquire_file_lock(path: Path) -> Optional[int]:
+    """Take an exclusive advisory lock on path; returns the descriptor holding it,
+    or None where flock is unavailable"""
+    if fcntl is None:
+        return None
+    
+    fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+def release_file_lock(fd: Optional[int]):
+    """Release a lock from acquire_file_lock; any thread may release it"""
+    if fd is not None:
+        # Closing the descriptor releases the lock
+        os.close(fd)
+
+def write_file_atomic(path: Path, data: bytes):
+    """Write data to a temp file in one go, fsync it and swap it into place"""
+    temp_file = path.with_suffix('.tmp' + path.suffix)
+    fd = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(temp_file, path)
+
 class TaskPriority(Enum):
     CRITICAL = 4
     HIGH = 3
@@ -51,9 +127,24 @@ class AgentStatus(Enum):
     FAILED = "failed"
     RECOVERING = "recovering"
 
+# Keywords in a task's type or description that make it suitable for a role
+ROLE_TASK_KEYWORDS = {
+    'auditor': ['audit', 'scan', 'check', 'review', 'analyze', 'inspect', 'security'],
+    'planner': ['plan', 'design', 'architect', 'breakdown', 'strategy', 'organize'],
+    'coder': ['implement', 'code', 'fix', 'refactor', 'develop', 'build', 'create'],
+    'tester': ['test', 'verify', 'validate', 'qa', 'check', 'assert'],
+    'reviewer': ['review', 'approve', 'check_pr', 'merge', 'feedback', 'comment']
+}
+
+# One alternation per role, so matching is a single regex search
+ROLE_TASK_PATTERNS = {
+    role: re.compile('|'.join(map(re.escape, keywords)), re.IGNORECASE)
+    for role, keywords in ROLE_TASK_KEYWORDS.items()
+}
+
 @dataclass
 class AgentHealth:
-    last_heartbeat: datetime
+    last_heartbeat: float  # epoch seconds
     tasks_completed: int
     tasks_failed: int
     average_task_time: float
@@ -64,8 +155,25 @@ class EnhancedAgentCoordinator:
     def __init__(self):
         self.agents: Dict[str, Dict] = {}
         self.agent_health: Dict[str, AgentHealth] = {}
-        self.task_queue: List[Dict] = []
-        self.audit_findings: List[Dict] = []
+        # Tasks by id in creation order; task_queue is a sorted view over this
+        self._tasks_by_id: Dict[str, Dict] = {}
+        self._tasks_by_status: Dict[str, Set[str]] = defaultdict(set)
+        # Running aggregates for project context, kept up to date on every
+        # change instead of recounted per call
+        self._task_type_counts: Counter = Counter()
+        self._task_priority_counts: Counter = Counter()
+        self._completion_durations: Dict[str, float] = {}
+        self._completion_time_sum = 0.0
+        self._finding_severity_counts: Counter = Counter()
+        self._finding_category_counts: Counter = Counter()
+        # Min-heaps of (-priority_score, created_at, task_id) for pending tasks,
+        # one per role the task suits. Entries are not removed when a task
+        # changes; stale ones are skipped on pop
+        self._pending_by_role: Dict[str, List[Tuple[int, str, str]]] = defaultdict(list)
+        # Rolling window of stored findings; the oldest are dropped (and
+        # unindexed) past max_findings
+        self.max_findings = 10000
+        self.audit_findings: deque = deque(maxlen=self.max_findings)
         self.worktrees: Dict[str, str] = {}
         self.base_dir = Path.cwd()
         self.data_dir = self.base_dir / "mcp-coordinator"
@@ -75,18 +183,83 @@ class EnhancedAgentCoordinator:
         self.task_history: deque = deque(maxlen=1000)
         self.agent_capabilities_cache: Dict[str, Set[str]] = {}
         self.task_retry_count: Dict[str, int] = defaultdict(int)
+        # Epoch creation and start times of tasks, so ages and durations
+        # don't need created_at/started_at parsed back from ISO strings
+        self._created_ts: Dict[str, float] = {}
+        self._started_ts: Dict[str, float] = {}
+        
+        # Min-heap of (deadline, agent_id, heartbeat) pushed on every
+        # heartbeat; an entry is stale once the agent has beaten again
+        self.heartbeat_timeout = 300  # seconds
+        self._heartbeat_deadlines: List[Tuple[float, str, float]] = []
+        
+        # Encoded project context, reused for a moment so bursts of agents
+        # asking at once share one build
+        self.context_cache_ttl = 1.0  # seconds
+        self._context_cache: Optional[Tuple[float, str]] = None
         self.max_retries = 3
         self.agent_load_balance: Dict[str, int] = defaultdict(int)
         
         # RAG features
         self.knowledge_base: Dict[str, Any] = {}
-        self.context_memory: Dict[str, List[Dict]] = defaultdict(list)
-        self.finding_patterns: Dict[str, int] = defaultdict(int)
+        # Approximate JSON size of the knowledge base, kept up to date on
+        # every update so health checks don't re-serialize it
+        self._kb_entry_sizes: Dict[Tuple[str, str], int] = {}
+        self._kb_size = 2
+        # Set on every knowledge base change; the sync loop skips clean passes
+        self._kb_dirty = False
+        self.context_memory: Dict[str, deque] = defaultdict(lambda: deque(maxlen=100))
+        self.finding_patterns: Counter = Counter()
+        
+        # Lowercased word sets for similarity lookups, computed once per task
+        # rather than on every query. Kept out of the records themselves so
+        # they aren't persisted.
+        self._desc_tokens: Dict[str, FrozenSet[str]] = {}
+        
+        # Inverted token -> finding id index over title and description;
+        # findings are numbered so matches come back oldest first
+        self._finding_token_index: Dict[str, Set[str]] = defaultdict(set)
+        self._finding_order: Dict[str, int] = {}
+        self._next_finding_seq = 0
+        
+        # Latest stored finding per dedup hash, and the most recent
+        # findings per category
+        self._finding_hash_index: Dict[str, Dict] = {}
+        self._findings_by_category: Dict[str, deque] = defaultdict(lambda: deque(maxlen=50))
+        
+        # Recently completed tasks, kept apart from the status-change
+        # history, with an inverted token -> task id index so similarity
+        # only scores tasks sharing a word
+        self._completed_history: deque = deque(maxlen=1000)
+        self._completed_entries: Dict[str, Tuple[str, str]] = {}
+        self._history_token_index: Dict[str, Set[str]] = defaultdict(set)
+        
+        # Coalesced state writes: mutations mark state dirty and the save
+        # loop writes it at most once per interval
+        self.save_interval = 2.0  # seconds
+        self._state_dirty = asyncio.Event()
+        self._last_save = 0.0
+        
+        # Snapshots are serialized on the event loop and written from a
+        # worker thread; sequence numbers keep an older snapshot from
+        # overwriting a newer one that reached disk first
+        self._write_lock = threading.Lock()
+        self._snapshot_seq = 0
+        self._written_seq = 0
+        
+        # Changes since the last snapshot, one JSON record per line, so a
+        # crash inside the save interval doesn't lose them
+        self.wal_file = self.data_dir / "state.wal"
+        self.wal_old_file = self.data_dir / "state.wal.old"
+        # Every agent session runs its own coordinator against the same
+        # files; this lock covers WAL rotation through the snapshot write
+        self.state_lock_file = self.data_dir / "state.json.lock"
         
         # Load persistent data
         self.load_state()
         
         # Start background tasks
+        asyncio.create_task(self._save_loop())
         asyncio.create_task(self._health_monitor_loop())
         asyncio.create_task(self._task_optimizer_loop())
         asyncio.create_task(self._knowledge_sync_loop())
@@ -97,79 +270,280 @@ class EnhancedAgentCoordinator:
         backup_file = self.data_dir / "state.backup.json"
         
         try:
+            state = None
             if state_file.exists():
-                with open(state_file, 'r') as f:
-                    state = json.load(f)
-                    self._restore_state(state)
-                    logger.info("State loaded successfully")
+                state = loads_json(state_file.read_bytes())
+                logger.info("State loaded successfully")
             elif backup_file.exists():
                 logger.warning("Loading from backup state")
-                with open(backup_file, 'r') as f:
-                    state = json.load(f)
-                    self._restore_state(state)
+                state = loads_json(backup_file.read_bytes())
+            
+            # Apply changes made after that snapshot was written
+            self._restore_state(self._replay_wal(state or {}))
         except Exception as e:
             logger.error(f"Failed to load state: {e}")
             logger.info("Starting with fresh state")
     
+    def _replay_wal(self, state: Dict) -> Dict:
+        """Apply logged changes onto a loaded snapshot"""
+        records = []
+        for wal_file in (self.wal_old_file, self.wal_file):
+            if not wal_file.exists():
+                continue
+            with open(wal_file, 'rb') as f:
+                for line in f:
+                    try:
+                        records.append(loads_json(line))
+                    except ValueError:
+                        # A torn final line from a crash mid-append
+                        logger.warning(f"Skipping unreadable record in {wal_file.name}")
+        
+        if not records:
+            return state
+        
+        agents = state.setdefault('agents', {})
+        agent_health = state.setdefault('agent_health', {})
+        tasks = {t['id']: t for t in state.get('task_queue', [])}
+        findings = {f['id']: f for f in state.get('audit_findings', [])}
+        
+        for record in records:
+            kind = record.get('type')
+            if kind == 'agent':
+                agents[record['agent']['id']] = record['agent']
+                agent_health[record['agent']['id']] = record['health']
+            elif kind == 'task':
+                tasks[record['task']['id']] = record['task']
+            elif kind == 'finding':
+                findings[record['finding']['id']] = record['finding']
+        
+        state['task_queue'] = list(tasks.values())
+        state['audit_findings'] = list(findings.values())
+        logger.info(f"Replayed {len(records)} logged changes")
+        return state
+    
+    def _log_change(self, kind: str, value: Dict, **extra):
+        """Append an upsert record for an agent, task or finding to the write-ahead log"""
+        record = {'type': kind, kind: value, **extra}
+        line = dumps_bytes(record) + b'\n'
+        try:
+            # O_APPEND keeps whole lines intact even with several coordinators appending
+            fd = os.open(self.wal_file, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            logger.error(f"Failed to log change: {e}")
+    
+    def _health_to_dict(self, health: AgentHealth) -> Dict:
+        """Serialize agent health for persistence"""
+        return {
+            'last_heartbeat': datetime.fromtimestamp(health.last_heartbeat).isoformat(),
+            'tasks_completed': health.tasks_completed,
+            'tasks_failed': health.tasks_failed,
+            'average_task_time': health.average_task_time,
+            'error_count': health.error_count,
+            'recovery_count': health.recovery_count
+        }
+    
+    @property
+    def task_queue(self) -> List[Dict]:
+        """All tasks, pending ones first by priority, then in creation order"""
+        return sorted(self._tasks_by_id.values(),
+                      key=lambda t: (t['status'] != 'pending', -t.get('priority_score', 2)
+                                     if t['status'] == 'pending' else 0))
+    
     def _restore_state(self, state: Dict):
         """Restore state from loaded data"""
         self.agents = state.get('agents', {})
-        self.task_queue = state.get('task_queue', [])
-        self.audit_findings = state.get('audit_findings', [])
+        self._tasks_by_id = {}
+        self._tasks_by_status = defaultdict(set)
+        self._pending_by_role = defaultdict(list)
+        self._desc_tokens = {}
+        self._created_ts = {}
+        self._task_type_counts = Counter()
+        self._task_priority_counts = Counter()
+        self._completion_durations = {}
+        self._completion_time_sum = 0.0
+        for task in sorted(state.get('task_queue', []), key=lambda t: t.get('created_at', '')):
+            self._tasks_by_id[task['id']] = task
+            self._tasks_by_status[task.get('status')].add(task['id'])
+            self._desc_tokens[task['id']] = self._tokenize(task.get('description', ''))
+            self._created_ts[task['id']] = datetime.fromisoformat(task['created_at']).timestamp()
+            self._task_type_counts[task['type']] += 1
+            self._task_priority_counts[task['priority']] += 1
+            self._track_completion_time(task)
+            if task.get('status') == 'pending':
+                self._push_pending(task)
+        
+        self._completed_history.clear()
+        self._completed_entries = {}
+        self._history_token_index = defaultdict(set)
+        completed = [self._tasks_by_id[task_id] for task_id in self._tasks_by_status['completed']]
+        for task in sorted(completed, key=lambda t: t.get('completed_at', '')):
+            self._record_completed(task)
+        self.audit_findings = deque(state.get('audit_findings', []), maxlen=self.max_findings)
+        self._finding_token_index = defaultdict(set)
+        self._finding_order = {}
+        self._next_finding_seq = 0
+        self._finding_hash_index = {}
+        self._findings_by_category.clear()
+        self._finding_severity_counts = Counter()
+        self._finding_category_counts = Counter()
+        for finding in self.audit_findings:
+            # Saved hashes may come from another digest (xxhash vs blake2b)
+            finding['hash'] = self._generate_finding_hash(finding)
+            self._index_finding(finding)
         self.knowledge_base = state.get('knowledge_base', {})
+        self._kb_dirty = bool(self.knowledge_base)
+        self._kb_entry_sizes = {}
+        self._kb_size = 2
+        for category, entries in self.knowledge_base.items():
+            self._kb_size += len(json.dumps(category)) + 6
+            for key, value in entries.items():
+                size = self._kb_entry_size(key, value)
+                self._kb_entry_sizes[(category, key)] = size
+                self._kb_size += size
         
         # Restore health data
         for agent_id, health_data in state.get('agent_health', {}).items():
             self.agent_health[agent_id] = AgentHealth(
-                last_heartbeat=datetime.fromisoformat(health_data['last_heartbeat']),
+                last_heartbeat=datetime.fromisoformat(health_data['last_heartbeat']).timestamp(),
                 tasks_completed=health_data['tasks_completed'],
                 tasks_failed=health_data['tasks_failed'],
                 average_task_time=health_data['average_task_time'],
                 error_count=health_data['error_count'],
                 recovery_count=health_data['recovery_count']
             )
+            self._push_heartbeat_deadline(agent_id)
     
     def save_state(self):
-        """Save state with backup and atomic write"""
+        """Mark state as changed; the save loop writes it shortly"""
+        self._state_dirty.set()
+    
+    def flush_state(self):
+        """Write state now, with backup and atomic write"""
+        snapshot = self._snapshot_state()
+        if snapshot is not None:
+            self._write_snapshot(*snapshot)
+    
+    def _snapshot_state(self) -> Optional[Tuple[int, bytes, Optional[int]]]:
+        """Serialize current state; returns its sequence number, bytes and held lock
+        
+        The state file lock is taken before the WAL is rotated and stays held
+        until _write_snapshot has written the snapshot and dropped the rotated
+        log, so no other coordinator can rotate or write in between.
+        """
+        self._state_dirty.clear()
+        self._last_save = time.monotonic()
+        
         state = {
             'agents': self.agents,
             'task_queue': self.task_queue,
-            'audit_findings': self.audit_findings,
+            'audit_findings': list(self.audit_findings),
             'knowledge_base': self.knowledge_base,
             'agent_health': {
-                agent_id: {
-                    'last_heartbeat': health.last_heartbeat.isoformat(),
-                    'tasks_completed': health.tasks_completed,
-                    'tasks_failed': health.tasks_failed,
-                    'average_task_time': health.average_task_time,
-                    'error_count': health.error_count,
-                    'recovery_count': health.recovery_count
-                }
+                agent_id: self._health_to_dict(health)
                 for agent_id, health in self.agent_health.items()
             },
+            'summary': self._build_summary(),
             'saved_at': datetime.now().isoformat()
         }
         
+        lock_fd = acquire_file_lock(self.state_lock_file)
+        try:
+            # Everything logged so far is covered by this snapshot; new
+            # changes go to a fresh log
+            self._rotate_wal()
+            
+            data = dumps_bytes(state)
+        except Exception as e:
+            release_file_lock(lock_fd)
+            logger.error(f"Failed to save state: {e}")
+            return None
+        
+        self._snapshot_seq += 1
+        return self._snapshot_seq, data, lock_fd
+    
+    def _write_snapshot(self, seq: int, data: bytes, lock_fd: Optional[int] = None):
+        """Write a serialized snapshot to disk and release its lock; safe to call from a worker thread"""
         state_file = self.data_dir / "state.json"
         temp_file = self.data_dir / "state.tmp.json"
         backup_file = self.data_dir / "state.backup.json"
         
         try:
-            # Write to temp file
-            with open(temp_file, 'w') as f:
-                json.dump(state, f, indent=2)
-            
-            # Backup current state
-            if state_file.exists():
-                state_file.rename(backup_file)
-            
-            # Atomic rename
-            temp_file.rename(state_file)
-            
-        except Exception as e:
-            logger.error(f"Failed to save state: {e}")
-            if temp_file.exists():
-                temp_file.unlink()
+            with self._write_lock:
+                if seq < self._written_seq:
+                    return  # A newer snapshot is already on disk
+                
+                try:
+                    # Backup current state, leaving state.json in place for readers
+                    if state_file.exists():
+                        backup_file.unlink(missing_ok=True)
+                        try:
+                            os.link(state_file, backup_file)
+                        except OSError:
+                            shutil.copy2(state_file, backup_file)
+                    
+                    # Single write + fsync, then atomic replace
+                    write_file_atomic(state_file, data)
+                    self._written_seq = seq
+                    
+                    # The snapshot is durable, so the rotated log can go -- unless
+                    # a newer snapshot has since rotated more records into it
+                    if seq == self._snapshot_seq:
+                        self.wal_old_file.unlink(missing_ok=True)
+                    
+                except Exception as e:
+                    logger.error(f"Failed to save state: {e}")
+                    if temp_file.exists():
+                        temp_file.unlink()
+        finally:
+            release_file_lock(lock_fd)
+    
+    def _rotate_wal(self):
+        """Move the current write-ahead log aside ahead of a snapshot"""
+        if not self.wal_file.exists():
+            return
+        
+        if self.wal_old_file.exists():
+            # The last snapshot failed, so its records are still needed
+            with open(self.wal_old_file, 'ab') as f:
+                f.write(self.wal_file.read_bytes())
+            self.wal_file.unlink()
+        else:
+            os.replace(self.wal_file, self.wal_old_file)
+    
+    def _build_summary(self) -> Dict:
+        """Precompute the counters and recent items the dashboard polls for"""
+        summary = {
+            'active_agents': sum(1 for a in self.agents.values() 
+                                 if a.get('status') == AgentStatus.ACTIVE.value),
+            'pending_tasks': 0,
+            'in_progress_tasks': 0,
+            'completed_tasks': 0,
+            'total_findings': len(self.audit_findings),
+            'critical_findings': 0,
+            'high_findings': 0
+        }
+        
+        for status in ('pending', 'in_progress', 'completed'):
+            summary[f"{status}_tasks"] = len(self._tasks_by_status[status])
+        
+        for severity in ('critical', 'high'):
+            summary[f"{severity}_findings"] = self._finding_severity_counts[severity]
+        
+        # Only the fields the dashboard renders, not the full task context
+        summary['recent_tasks'] = [
+            {k: task.get(k) for k in ('id', 'type', 'description', 'status', 'created_at')}
+            for task in heapq.nlargest(5, self._tasks_by_id.values(), key=lambda t: t.get('created_at', ''))
+        ]
+        summary['recent_findings'] = [
+            {k: finding.get(k) for k in ('id', 'title', 'severity', 'file_path', 'submitted_at')}
+            for finding in heapq.nlargest(5, self.audit_findings, key=lambda f: f.get('submitted_at', ''))
+        ]
+        
+        return summary
     
     def register_agent(self, agent_id: str, role: str, capabilities: List[str]) -> Dict:
         """Register agent with health monitoring"""
@@ -187,18 +561,22 @@ class EnhancedAgentCoordinator:
         
         # Initialize health tracking
         self.agent_health[agent_id] = AgentHealth(
-            last_heartbeat=now,
+            last_heartbeat=now.timestamp(),
             tasks_completed=0,
             tasks_failed=0,
             average_task_time=0.0,
             error_count=0,
             recovery_count=0
         )
+        self._push_heartbeat_deadline(agent_id)
         
         # Cache capabilities
         self.agent_capabilities_cache[agent_id] = set(capabilities)
         
-        self.save_state()
+        # Registrations are rare and worth persisting straight away
+        self._log_change('agent', self.agents[agent_id], 
+                         health=self._health_to_dict(self.agent_health[agent_id]))
+        self.flush_state()
         logger.info(f"Agent registered: {agent_id} ({role}) with capabilities: {capabilities}")
         
         # Add to knowledge base
@@ -242,84 +620,135 @@ class EnhancedAgentCoordinator:
         }
         
         # Add to queue with smart positioning
+        self._created_ts[task_id] = now.timestamp()
         self._insert_task_by_priority(task)
         
+        self._log_change('task', task)
         self.save_state()
         logger.info(f"Task created: {task_id} - {description} (priority: {priority})")
         
         # Update knowledge base
+        pattern = self.knowledge_base.get('task_patterns', {}).get(task_type, {})
         self._update_knowledge_base('task_patterns', task_type, {
-            'count': self.knowledge_base.get('task_patterns', {}).get(task_type, {}).get('count', 0) + 1,
+            'count': pattern.get('count', 0) + 1,
             'last_created': now.isoformat()
         })
         
         return task
     
     def _insert_task_by_priority(self, task: Dict):
-        """Insert task in queue based on priority and dependencies"""
-        if not self.task_queue:
-            self.task_queue.append(task)
-            return
-        
-        # Find insertion point
-        insert_index = len(self.task_queue)
-        for i, existing_task in enumerate(self.task_queue):
-            if existing_task['status'] == 'pending':
-                if task['priority_score'] > existing_task.get('priority_score', 2):
-                    insert_index = i
-                    break
+        """Add task to the queue, ordered by priority then age"""
+        self._tasks_by_id[task['id']] = task
+        self._tasks_by_status[task['status']].add(task['id'])
+        self._desc_tokens[task['id']] = self._tokenize(task['description'])
+        self._task_type_counts[task['type']] += 1
+        self._task_priority_counts[task['priority']] += 1
+        self._push_pending(task)
+    
+    def _set_task_status(self, task: Dict, status: str):
+        """Change a task's status, keeping the status index and dispatch heaps in step"""
+        previous = task['status']
+        self._tasks_by_status[previous].discard(task['id'])
+        task['status'] = status
+        self._tasks_by_status[status].add(task['id'])
+        self._track_completion_time(task)
         
-        self.task_queue.insert(insert_index, task)
+        # Any move back to pending (retry, recovery, or an agent handing the
+        # task back through update_task) makes it dispatchable again
+        if status == 'pending' and previous != 'pending':
+            self._push_pending(task)
+    
+    def _track_completion_time(self, task: Dict):
+        """Keep a task's duration in the completion-time total while it is completed"""
+        previous = self._completion_durations.pop(task['id'], None)
+        if previous is not None:
+            self._completion_time_sum -= previous
+        
+        if task.get('status') == 'completed' and 'actual_duration' in task:
+            self._completion_durations[task['id']] = task['actual_duration']
+            self._completion_time_sum += task['actual_duration']
+    
+    def _push_pending(self, task: Dict):
+        """Queue a pending task for dispatch at its current priority"""
+        entry = (-task.get('priority_score', 2), task.get('created_at', ''), task['id'])
+        for role in ROLE_TASK_PATTERNS:
+            if self._is_task_suitable_for_role(task, role):
+                heapq.heappush(self._pending_by_role[role], entry)
+    
+    def _is_live_entry(self, entry: Tuple[int, str, str]) -> bool:
+        """Check a heap entry still describes a pending task at that priority"""
+        task = self._tasks_by_id.get(entry[2])
+        return (task is not None and task['status'] == 'pending' 
+                and -task.get('priority_score', 2) == entry[0])
     
     def get_next_task(self, agent_id: str, agent_role: str) -> Optional[Dict]:
         """Get next task with load balancing and capability matching"""
+        now = datetime.now()
+        now_iso = now.isoformat()
+        
         # Update agent status
         if agent_id in self.agents:
-            self.agents[agent_id]['last_seen'] = datetime.now().isoformat()
+            self.agents[agent_id]['last_seen'] = now_iso
             self.agents[agent_id]['status'] = AgentStatus.BUSY.value
-            self.agent_health[agent_id].last_heartbeat = datetime.now()
+            self.agent_health[agent_id].last_heartbeat = now.timestamp()
+            self._push_heartbeat_deadline(agent_id)
         
-        # Find suitable task with smart matching
+        # Find suitable task with smart matching, highest priority first
         agent_capabilities = self.agent_capabilities_cache.get(agent_id, set())
         
-        for task in self.task_queue:
-            if task['status'] == 'pending':
-                # Check role suitability
-                if not self._is_task_suitable_for_role(task, agent_role):
-                    continue
-                
-                # Check dependencies
-                if not self._are_dependencies_met(task):
-                    continue
-                
-                # Check agent capabilities
-                if not self._agent_has_required_capabilities(task, agent_capabilities):
-                    continue
-                
-                # Check load balancing
-                if self._is_agent_overloaded(agent_id):
-                    logger.info(f"Agent {agent_id} is overloaded, skipping assignment")
-                    continue
-                
-                # Assign task
-                task['status'] = 'in_progress'
-                task['assigned_to'] = agent_id
-                task['started_at'] = datetime.now().isoformat()
-                task['updated_at'] = datetime.now().isoformat()
-                
-                # Update load balance
-                self.agent_load_balance[agent_id] += 1
-                
-                # Add to agent context memory
-                self.context_memory[agent_id].append({
-                    'task_id': task['id'],
-                    'type': task['type'],
-                    'started': task['started_at']
-                })
-                
-                self.save_state()
-                logger.info(f"Task {task['id']} assigned to {agent_id}")
-                return task
+        # Only tasks suited to this role are in its heap
+        pending = self._pending_by_role.get(agent_role, [])
+        
+        task = None
+        skipped = []
+        while pending:
+            entry = heapq.heappop(pending)
+            if not self._is_live_entry(entry):
+                continue  # Stale entry, drop it
+            
+            candidate = self._tasks_by_id[entry[2]]
+            
+            # Check dependencies and agent capabilities
+            if (not self._are_dependencies_met(candidate)
+                    or not self._agent_has_required_capabilities(candidate, agent_capabilities)):
+                skipped.append(entry)
+                continue
+            
+            # Check load balancing
+            if self._is_agent_overloaded(agent_id):
+                logger.info(f"Agent {agent_id} is overloaded, skipping assignment")
+                skipped.append(entry)
+                break
+            
+            task = candidate
+            break
+        
+        # Put back everything we looked at but didn't take
+        for entry in skipped:
+            heapq.heappush(pending, entry)
+        
+        if task is not None:
+            # Assign task
+            self._set_task_status(task, 'in_progress')
+            task['assigned_to'] = agent_id
+            task['started_at'] = now_iso
+            self._started_ts[task['id']] = now.timestamp()
+            task['updated_at'] = now_iso
+            
+            # Update load balance
+            self.agent_load_balance[agent_id] += 1
+            
+            # Add to agent context memory
+            self.context_memory[agent_id].append({
+                'task_id': task['id'],
+                'type': task['type'],
+                'started': task['started_at']
+            })
+            
+            self._log_change('task', task)
+            self.save_state()
+            logger.info(f"Task {task['id']} assigned to {agent_id}")
+            return task
         
         # No suitable task found
         if agent_id in self.agents:
@@ -329,21 +758,12 @@ class EnhancedAgentCoordinator:
     
     def _is_task_suitable_for_role(self, task: Dict, role: str) -> bool:
         """Enhanced role matching with fuzzy logic"""
-        role_task_mapping = {
-            'auditor': ['audit', 'scan', 'check', 'review', 'analyze', 'inspect', 'security'],
-            'planner': ['plan', 'design', 'architect', 'breakdown', 'strategy', 'organize'],
-            'coder': ['implement', 'code', 'fix', 'refactor', 'develop', 'build', 'create'],
-            'tester': ['test', 'verify', 'validate', 'qa', 'check', 'assert'],
-            'reviewer': ['review', 'approve', 'check_pr', 'merge', 'feedback', 'comment']
-        }
-        
-        task_keywords = role_task_mapping.get(role, [])
-        task_type_lower = task['type'].lower()
-        task_desc_lower = task['description'].lower()
+        pattern = ROLE_TASK_PATTERNS.get(role)
+        if pattern is None:
+            return False
         
         # Check task type and description
-        return any(keyword in task_type_lower or keyword in task_desc_lower 
-                  for keyword in task_keywords)
+        return bool(pattern.search(task['type']) or pattern.search(task['description']))
     
     def _are_dependencies_met(self, task: Dict) -> bool:
         """Check if task dependencies are completed"""
@@ -351,7 +771,7 @@ class EnhancedAgentCoordinator:
             return True
         
         for dep_id in task['dependencies']:
-            dep_task = next((t for t in self.task_queue if t['id'] == dep_id), None)
+            dep_task = self._tasks_by_id.get(dep_id)
             if not dep_task or dep_task['status'] != 'completed':
                 return False
         
@@ -381,26 +801,29 @@ class EnhancedAgentCoordinator:
     
     def update_task(self, task_id: str, status: str, result: Optional[Dict] = None) -> Dict:
         """Update task with retry logic and learning"""
-        task = None
-        for t in self.task_queue:
-            if t['id'] == task_id:
-                task = t
-                break
-        
+        task = self._tasks_by_id.get(task_id)
         if not task:
             raise ValueError(f"Task not found: {task_id}")
         
+        now = datetime.now()
+        now_iso = now.isoformat()
+        
         previous_status = task['status']
-        task['status'] = status
-        task['updated_at'] = datetime.now().isoformat()
+        self._set_task_status(task, status)
+        task['updated_at'] = now_iso
+        started_ts = self._started_ts.pop(task_id, None)
         
         if status == 'completed':
-            task['completed_at'] = datetime.now().isoformat()
+            task['completed_at'] = now_iso
             
-            # Calculate duration
-            if 'started_at' in task:
-                duration = (datetime.now() - datetime.fromisoformat(task['started_at'])).total_seconds()
+            # Calculate duration, parsing started_at only for tasks
+            # started before a restart
+            if started_ts is None and 'started_at' in task:
+                started_ts = datetime.fromisoformat(task['started_at']).timestamp()
+            if started_ts is not None:
+                duration = now.timestamp() - started_ts
                 task['actual_duration'] = duration
+                self._track_completion_time(task)
                 
                 # Update agent health
                 agent_id = task.get('assigned_to')
@@ -417,9 +840,11 @@ class EnhancedAgentCoordinator:
             
             # Learn from completion
             self._learn_from_task_completion(task)
+            if previous_status != 'completed':
+                self._record_completed(task)
             
         elif status == 'failed':
-            task['failed_at'] = datetime.now().isoformat()
+            task['failed_at'] = now_iso
             
             # Update agent health
             agent_id = task.get('assigned_to')
@@ -431,7 +856,7 @@ class EnhancedAgentCoordinator:
             retry_count = task.get('retry_count', 0)
             if retry_count < self.max_retries:
                 task['retry_count'] = retry_count + 1
-                task['status'] = 'pending'  # Reset to pending for retry
+                self._set_task_status(task, 'pending')  # Reset to pending for retry
                 task['assigned_to'] = None  # Unassign for fresh assignment
                 
                 # Update load balance
@@ -449,9 +874,10 @@ class EnhancedAgentCoordinator:
         self.task_history.append({
             'task_id': task_id,
             'status_change': f"{previous_status} -> {status}",
-            'timestamp': datetime.now().isoformat()
+            'timestamp': now_iso
         })
         
+        self._log_change('task', task)
         self.save_state()
         logger.info(f"Task updated: {task_id} - {status}")
         return task
@@ -477,8 +903,11 @@ class EnhancedAgentCoordinator:
             finding['pattern'] = pattern
             finding['pattern_count'] = self.finding_patterns[pattern]
             
-            # Add to findings
+            # Add to findings, dropping the oldest past the window
+            if len(self.audit_findings) == self.audit_findings.maxlen:
+                self._unindex_finding(self.audit_findings[0])
             self.audit_findings.append(finding)
+            self._index_finding(finding)
             
             # Create task with enhanced context
             task = self.create_task(
@@ -494,6 +923,7 @@ class EnhancedAgentCoordinator:
             )
             
             finding['task_id'] = task['id']
+            self._log_change('finding', finding)
         
         self.save_state()
         logger.info(f"Audit finding submitted: {finding['title']} (status: {finding['status']})")
@@ -508,14 +938,14 @@ class EnhancedAgentCoordinator:
             finding.get('title', '')[:50]  # First 50 chars of title
         ]
         
-        return hashlib.md5('|'.join(key_parts).encode()).hexdigest()
+        return finding_digest('|'.join(key_parts).encode())
     
     def _is_duplicate_finding(self, finding_hash: str) -> bool:
         """Check if finding is duplicate"""
-        for existing in self.audit_findings:
-            if existing.get('hash') == finding_hash and existing.get('status') != 'resolved':
-                return True
-        return False
+        # A stored finding only gets a hash nobody else holds unresolved,
+        # so checking the latest one with this hash is enough
+        existing = self._finding_hash_index.get(finding_hash)
+        return existing is not None and existing.get('status') != 'resolved'
     
     def _extract_finding_pattern(self, finding: Dict) -> str:
         """Extract pattern from finding for learning"""
@@ -523,53 +953,110 @@ class EnhancedAgentCoordinator:
     
     def _find_similar_findings(self, finding: Dict) -> List[Dict]:
         """Find similar past findings"""
-        similar = []
-        finding_category = finding.get('category', '')
-        
-        for past_finding in self.audit_findings[-50:]:  # Check last 50 findings
-            if past_finding.get('category') == finding_category:
-                similar.append({
-                    'id': past_finding['id'],
-                    'title': past_finding['title'],
-                    'resolution': past_finding.get('resolution', 'pending')
-                })
-        
-        return similar[:5]  # Return top 5 similar
+        # Last 50 findings in the same category
+        recent = self._findings_by_category.get(finding.get('category', ''), ())
+        
+        return [{
+            'id': past_finding['id'],
+            'title': past_finding['title'],
+            'resolution': past_finding.get('resolution', 'pending')
+        } for past_finding in islice(recent, 5)]  # Return top 5 similar
+    
+    @staticmethod
+    def _tokenize(text: str) -> FrozenSet[str]:
+        """Lowercased word set used for similarity scoring"""
+        return frozenset(text.lower().split())
+    
+    def _index_finding(self, finding: Dict):
+        """Index a stored finding by hash, category and words"""
+        self._finding_hash_index[finding['hash']] = finding
+        self._findings_by_category[finding.get('category', '')].append(finding)
+        self._finding_severity_counts[finding.get('severity', 'unknown')] += 1
+        self._finding_category_counts[finding.get('category', 'unknown')] += 1
+        
+        self._finding_order[finding['id']] = self._next_finding_seq
+        self._next_finding_seq += 1
+        text = f"{finding.get('title', '')} {finding.get('description', '')}"
+        for word in self._tokenize(text):
+            self._finding_token_index[word].add(finding['id'])
+    
+    def _unindex_finding(self, finding: Dict):
+        """Drop a finding leaving the rolling window from every index"""
+        if self._finding_hash_index.get(finding['hash']) is finding:
+            del self._finding_hash_index[finding['hash']]
+        
+        recent = self._findings_by_category.get(finding.get('category', ''))
+        if recent and recent[0] is finding:
+            recent.popleft()
+        self._finding_severity_counts[finding.get('severity', 'unknown')] -= 1
+        self._finding_category_counts[finding.get('category', 'unknown')] -= 1
+        
+        self._finding_order.pop(finding['id'], None)
+        text = f"{finding.get('title', '')} {finding.get('description', '')}"
+        for word in self._tokenize(text):
+            ids = self._finding_token_index.get(word)
+            if ids is not None:
+                ids.discard(finding['id'])
+                if not ids:
+                    del self._finding_token_index[word]
     
     def _find_related_findings(self, description: str) -> List[str]:
         """Find findings related to task description"""
-        related = []
-        desc_lower = description.lower()
-        
-        for finding in self.audit_findings:
-            if any(word in finding.get('title', '').lower() or 
-                   word in finding.get('description', '').lower()
-                   for word in desc_lower.split()[:5]):  # Check first 5 words
-                related.append(finding['id'])
+        related = set()
+        for word in description.lower().split()[:5]:  # Check first 5 words
+            related.update(self._finding_token_index.get(word, ()))
         
-        return related[:3]
+        return heapq.nsmallest(3, related, key=self._finding_order.__getitem__)
+    
+    def _record_completed(self, task: Dict):
+        """Add a completed task to the similarity history and its index"""
+        if len(self._completed_history) == self._completed_history.maxlen:
+            self._unindex_completed(self._completed_history[0])
+        
+        entry = (task['id'], task.get('completed_at', ''))
+        self._completed_history.append(entry)
+        self._completed_entries[task['id']] = entry
+        for word in self._desc_tokens[task['id']]:
+            self._history_token_index[word].add(task['id'])
+    
+    def _unindex_completed(self, entry: Tuple[str, str]):
+        """Drop a task leaving the completed history from the index"""
+        task_id = entry[0]
+        if self._completed_entries.get(task_id) is not entry:
+            return  # Completed again since; the newer entry still counts
+        del self._completed_entries[task_id]
+        for word in self._desc_tokens[task_id]:
+            ids = self._history_token_index.get(word)
+            if ids is not None:
+                ids.discard(task_id)
+                if not ids:
+                    del self._history_token_index[word]
     
     def _find_similar_tasks(self, description: str) -> List[Dict]:
         """Find similar completed tasks for context"""
         similar = []
-        desc_words = set(description.lower().split())
+        desc_words = self._tokenize(description)
         
-        for task in self.task_history:
-            if isinstance(task, dict) and 'description' in task:
-                task_words = set(task['description'].lower().split())
-                similarity = len(desc_words & task_words) / len(desc_words | task_words)
-                
-                if similarity > 0.3:  # 30% similarity threshold
-                    similar.append({
-                        'task_id': task.get('id'),
-                        'description': task.get('description'),
-                        'duration': task.get('actual_duration'),
-                        'similarity': similarity
-                    })
-        
-        # Sort by similarity and return top 3
-        similar.sort(key=lambda x: x['similarity'], reverse=True)
-        return similar[:3]
+        # Only tasks sharing at least one word can clear the threshold
+        candidates = set()
+        for word in desc_words:
+            candidates.update(self._history_token_index.get(word, ()))
+        
+        for task_id in candidates:
+            task = self._tasks_by_id[task_id]
+            task_words = self._desc_tokens[task_id]
+            similarity = len(desc_words & task_words) / len(desc_words | task_words)
+            
+            if similarity > 0.3:  # 30% similarity threshold
+                similar.append({
+                    'task_id': task.get('id'),
+                    'description': task.get('description'),
+                    'duration': task.get('actual_duration'),
+                    'similarity': similarity
+                })
+        
+        # Top 3 by similarity
+        return heapq.nlargest(3, similar, key=lambda x: x['similarity'])
     
     def _estimate_task_duration(self, task_type: str, description: str) -> float:
         """Estimate task duration based on historical data"""
@@ -598,20 +1085,35 @@ class EnhancedAgentCoordinator:
         actual_duration = task.get('actual_duration', 0)
         
         if actual_duration > 0:
-            # Update knowledge base
+            # Update knowledge base with a running total and average
+            previous = self.knowledge_base.get('task_durations', {}).get(task_type, {})
+            count = previous.get('count', 0) + 1
+            total_duration = previous.get('total_duration', 0) + actual_duration
             self._update_knowledge_base('task_durations', task_type, {
-                'count': self.knowledge_base.get('task_durations', {}).get(task_type, {}).get('count', 0) + 1,
-                'total_duration': self.knowledge_base.get('task_durations', {}).get(task_type, {}).get('total_duration', 0) + actual_duration,
-                'average_duration': (self.knowledge_base.get('task_durations', {}).get(task_type, {}).get('total_duration', 0) + actual_duration) / 
-                                  (self.knowledge_base.get('task_durations', {}).get(task_type, {}).get('count', 0) + 1)
+                'count': count,
+                'total_duration': total_duration,
+                'average_duration': total_duration / count
             })
     
     def _update_knowledge_base(self, category: str, key: str, value: Any):
         """Update knowledge base with new information"""
+        # Entries are always replaced, never mutated in place, so the
+        # knowledge sync can serialize a shallow snapshot off the loop
         if category not in self.knowledge_base:
             self.knowledge_base[category] = {}
+            self._kb_size += len(json.dumps(category)) + 6
         
         self.knowledge_base[category][key] = value
+        self._kb_dirty = True
+        
+        size = self._kb_entry_size(key, value)
+        self._kb_size += size - self._kb_entry_sizes.get((category, key), 0)
+        self._kb_entry_sizes[(category, key)] = size
+    
+    @staticmethod
+    def _kb_entry_size(key: str, value: Any) -> int:
+        """JSON size of one knowledge base entry, separators included"""
+        return len(json.dumps(key)) + len(json.dumps(value, default=str)) + 4
     
     def get_agent_health_report(self, agent_id: str) -> Dict:
         """Get detailed health report for an agent"""
@@ -630,19 +1132,11 @@ class EnhancedAgentCoordinator:
         
         if health:
             # Calculate health score
-            time_since_heartbeat = (datetime.now() - health.last_heartbeat).total_seconds()
-            
-            if time_since_heartbeat > 300:  # 5 minutes
-                report['health'] = 'critical'
-            elif health.error_count > 10 or health.tasks_failed > health.tasks_completed * 0.3:
-                report['health'] = 'poor'
-            elif health.error_count > 5 or health.tasks_failed > health.tasks_completed * 0.1:
-                report['health'] = 'fair'
-            else:
-                report['health'] = 'good'
+            time_since_heartbeat = time.time() - health.last_heartbeat
+            report['health'] = self._health_bucket(health, time_since_heartbeat)
             
             report['metrics'] = {
-                'last_heartbeat': health.last_heartbeat.isoformat(),
+                'last_heartbeat': datetime.fromtimestamp(health.last_heartbeat).isoformat(),
                 'time_since_heartbeat': time_since_heartbeat,
                 'tasks_completed': health.tasks_completed,
                 'tasks_failed': health.tasks_failed,
@@ -655,33 +1149,46 @@ class EnhancedAgentCoordinator:
         
         return report
     
+    @staticmethod
+    def _health_bucket(health: AgentHealth, time_since_heartbeat: float) -> str:
+        """Classify an agent as good, fair, poor or critical"""
+        if time_since_heartbeat > 300:  # 5 minutes
+            return 'critical'
+        elif health.error_count > 10 or health.tasks_failed > health.tasks_completed * 0.3:
+            return 'poor'
+        elif health.error_count > 5 or health.tasks_failed > health.tasks_completed * 0.1:
+            return 'fair'
+        return 'good'
+    
     def get_system_health(self) -> Dict:
         """Get overall system health report"""
         total_agents = len(self.agents)
         active_agents = len([a for a in self.agents.values() if a['status'] == AgentStatus.ACTIVE.value])
         
-        total_tasks = len(self.task_queue)
-        pending_tasks = len([t for t in self.task_queue if t['status'] == 'pending'])
-        in_progress_tasks = len([t for t in self.task_queue if t['status'] == 'in_progress'])
-        completed_tasks = len([t for t in self.task_queue if t['status'] == 'completed'])
-        failed_tasks = len([t for t in self.task_queue if t['status'] == 'failed'])
+        total_tasks = len(self._tasks_by_id)
+        pending_tasks = len(self._tasks_by_status['pending'])
+        in_progress_tasks = len(self._tasks_by_status['in_progress'])
+        completed_tasks = len(self._tasks_by_status['completed'])
+        failed_tasks = len(self._tasks_by_status['failed'])
         
         # Calculate task completion rate
         completion_rate = completed_tasks / max(1, completed_tasks + failed_tasks)
         
         # Check agent health
+        now = datetime.now()
+        now_ts = now.timestamp()
         unhealthy_agents = 0
         for agent_id in self.agents:
-            try:
-                health_report = self.get_agent_health_report(agent_id)
-                if health_report['health'] in ['poor', 'critical']:
-                    unhealthy_agents += 1
-            except:
-                pass
+            health = self.agent_health.get(agent_id)
+            if health is None:
+                continue
+            time_since_heartbeat = now_ts - health.last_heartbeat
+            if self._health_bucket(health, time_since_heartbeat) in ('poor', 'critical'):
+                unhealthy_agents += 1
         
         return {
             'status': 'healthy' if unhealthy_agents == 0 and completion_rate > 0.8 else 'degraded',
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now.isoformat(),
             'agents': {
                 'total': total_agents,
                 'active': active_agents,
@@ -701,7 +1208,7 @@ class EnhancedAgentCoordinator:
             },
             'knowledge_base': {
                 'categories': list(self.knowledge_base.keys()),
-                'size': len(json.dumps(self.knowledge_base))
+                'size': self._kb_size
             }
         }
     
@@ -717,10 +1224,12 @@ class EnhancedAgentCoordinator:
         agent['status'] = AgentStatus.RECOVERING.value
         
         # Clear agent's current tasks
-        for task in self.task_queue:
-            if task.get('assigned_to') == agent_id and task['status'] == 'in_progress':
-                task['status'] = 'pending'
+        for task_id in list(self._tasks_by_status['in_progress']):
+            task = self._tasks_by_id[task_id]
+            if task.get('assigned_to') == agent_id:
+                self._set_task_status(task, 'pending')
                 task['assigned_to'] = None
+                self._log_change('task', task)
                 logger.info(f"Unassigned task {task['id']} from recovering agent {agent_id}")
         
         # Reset load balance
@@ -730,7 +1239,8 @@ class EnhancedAgentCoordinator:
         if health:
             health.recovery_count += 1
             health.error_count = 0
-            health.last_heartbeat = datetime.now()
+            health.last_heartbeat = time.time()
+            self._push_heartbeat_deadline(agent_id)
         
         # Schedule status update
         asyncio.create_task(self._complete_recovery(agent_id))
@@ -747,24 +1257,61 @@ class EnhancedAgentCoordinator:
             self.agents[agent_id]['status'] = AgentStatus.ACTIVE.value
             logger.info(f"Agent {agent_id} recovery completed")
     
+    async def _save_loop(self):
+        """Background task to write dirty state, at most once per save interval"""
+        while True:
+            try:
+                await self._state_dirty.wait()
+                
+                # Let a burst of mutations collapse into a single write
+                delay = self.save_interval - (time.monotonic() - self._last_save)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                
+                # Serialize here, where state can't change underneath us,
+                # and keep the disk write and fsync off the event loop
+                snapshot = self._snapshot_state()
+                if snapshot is not None:
+                    await asyncio.get_event_loop().run_in_executor(
+                        None, self._write_snapshot, *snapshot
+                    )
+                
+            except Exception as e:
+                logger.error(f"State save error: {e}")
+    
+    def _push_heartbeat_deadline(self, agent_id: str):
+        """Schedule a liveness check for an agent's latest heartbeat"""
+        heartbeat = self.agent_health[agent_id].last_heartbeat
+        heapq.heappush(self._heartbeat_deadlines, 
+                       (heartbeat + self.heartbeat_timeout, agent_id, heartbeat))
+    
     async def _health_monitor_loop(self):
         """Background task to monitor agent health"""
         while True:
             try:
-                await asyncio.sleep(60)  # Check every minute
+                # Sleep until the earliest heartbeat could have timed out;
+                # deadlines only ever move later, so nothing can jump ahead
+                if self._heartbeat_deadlines:
+                    delay = self._heartbeat_deadlines[0][0] - time.time()
+                else:
+                    delay = 60
+                await asyncio.sleep(max(0, delay))
                 
-                for agent_id, agent in list(self.agents.items()):
+                now = time.time()
+                while self._heartbeat_deadlines and self._heartbeat_deadlines[0][0] <= now:
+                    _, agent_id, heartbeat = heapq.heappop(self._heartbeat_deadlines)
+                    
+                    agent = self.agents.get(agent_id)
                     health = self.agent_health.get(agent_id)
-                    if health:
-                        time_since_heartbeat = (datetime.now() - health.last_heartbeat).total_seconds()
+                    if agent is None or health is None or health.last_heartbeat != heartbeat:
+                        continue  # Agent has beaten since; a later entry covers it
+                    
+                    if agent['status'] != AgentStatus.FAILED.value:
+                        logger.warning(f"Agent {agent_id} appears to be unresponsive")
+                        agent['status'] = AgentStatus.FAILED.value
                         
-                        if time_since_heartbeat > 300:  # 5 minutes
-                            if agent['status'] != AgentStatus.FAILED.value:
-                                logger.warning(f"Agent {agent_id} appears to be unresponsive")
-                                agent['status'] = AgentStatus.FAILED.value
-                                
-                                # Attempt recovery
-                                self.recover_agent(agent_id)
+                        # Attempt recovery
+                        self.recover_agent(agent_id)
                 
             except Exception as e:
                 logger.error(f"Health monitor error: {e}")
@@ -776,22 +1323,16 @@ class EnhancedAgentCoordinator:
                 await asyncio.sleep(120)  # Optimize every 2 minutes
                 
                 # Re-prioritize stale tasks
-                for task in self.task_queue:
-                    if task['status'] == 'pending':
-                        created_time = datetime.fromisoformat(task['created_at'])
-                        age_minutes = (datetime.now() - created_time).total_seconds() / 60
-                        
-                        # Boost priority of old tasks
-                        if age_minutes > 30 and task.get('priority_score', 2) < 4:
-                            task['priority_score'] = min(4, task.get('priority_score', 2) + 1)
-                            logger.info(f"Boosted priority of stale task {task['id']}")
-                
-                # Re-sort queue
-                self.task_queue.sort(key=lambda t: (
-                    t['status'] != 'pending',  # Pending first
-                    -t.get('priority_score', 2),  # Higher priority first
-                    t['created_at']  # Older first
-                ))
+                now = time.time()
+                for task_id in self._tasks_by_status['pending']:
+                    task = self._tasks_by_id[task_id]
+                    age_minutes = (now - self._created_ts[task_id]) / 60
+                    
+                    # Boost priority of old tasks; the old heap entry goes stale
+                    if age_minutes > 30 and task.get('priority_score', 2) < 4:
+                        task['priority_score'] = min(4, task.get('priority_score', 2) + 1)
+                        self._push_pending(task)
+                        logger.info(f"Boosted priority of stale task {task_id}")
                 
             except Exception as e:
                 logger.error(f"Task optimizer error: {e}")
@@ -802,16 +1343,33 @@ class EnhancedAgentCoordinator:
             try:
                 await asyncio.sleep(300)  # Sync every 5 minutes
                 
-                # Save knowledge base separately for backup
+                if not self._kb_dirty:
+                    continue  # Nothing changed since the last sync
+                
+                # Save knowledge base separately for backup; a copy of both
+                # dict levels is encoded and written from a worker thread
                 kb_file = self.data_dir / "knowledge_base.json"
-                with open(kb_file, 'w') as f:
-                    json.dump(self.knowledge_base, f, indent=2)
+                snapshot = {category: dict(entries) 
+                            for category, entries in self.knowledge_base.items()}
+                self._kb_dirty = False
+                try:
+                    await asyncio.get_event_loop().run_in_executor(
+                        None, self._write_kb_backup, kb_file, snapshot
+                    )
+                except Exception:
+                    self._kb_dirty = True  # Retry on the next pass
+                    raise
                 
                 logger.info("Knowledge base synced")
                 
             except Exception as e:
                 logger.error(f"Knowledge sync error: {e}")
     
+    @staticmethod
+    def _write_kb_backup(kb_file: Path, snapshot: Dict):
+        """Encode the knowledge base snapshot and write it in one go"""
+        write_file_atomic(kb_file, dumps_bytes(snapshot, indent=True))
+    
     def create_worktree(self, branch_name: str) -> str:
         """Create a git worktree with enhanced error handling"""
         worktree_path = self.base_dir / "agent-workspaces" / branch_name
@@ -878,16 +1436,17 @@ class EnhancedAgentCoordinator:
                 'health_summary': {}
             },
             'tasks': {
-                'total': len(self.task_queue),
-                'by_status': defaultdict(int),
-                'by_type': defaultdict(int),
-                'by_priority': defaultdict(int),
+                'total': len(self._tasks_by_id),
+                'by_status': defaultdict(int, {status: len(ids) 
+                                               for status, ids in self._tasks_by_status.items() if ids}),
+                'by_type': defaultdict(int, self._task_type_counts),
+                'by_priority': defaultdict(int, self._task_priority_counts),
                 'average_completion_time': 0
             },
             'findings': {
                 'total': len(self.audit_findings),
-                'by_severity': defaultdict(int),
-                'by_category': defaultdict(int),
+                'by_severity': defaultdict(int, +self._finding_severity_counts),
+                'by_category': defaultdict(int, +self._finding_category_counts),
                 'top_patterns': []
             },
             'system_health': self.get_system_health(),
@@ -899,26 +1458,13 @@ class EnhancedAgentCoordinator:
             context['agents']['by_role'][agent['role']] += 1
             context['agents']['by_status'][agent['status']] += 1
         
-        # Aggregate task data
-        completed_durations = []
-        for task in self.task_queue:
-            context['tasks']['by_status'][task['status']] += 1
-            context['tasks']['by_type'][task['type']] += 1
-            context['tasks']['by_priority'][task['priority']] += 1
-            
-            if task['status'] == 'completed' and 'actual_duration' in task:
-                completed_durations.append(task['actual_duration'])
-        
-        if completed_durations:
-            context['tasks']['average_completion_time'] = sum(completed_durations) / len(completed_durations)
-        
-        # Aggregate findings data
-        for finding in self.audit_findings:
-            context['findings']['by_severity'][finding.get('severity', 'unknown')] += 1
-            context['findings']['by_category'][finding.get('category', 'unknown')] += 1
+        # Task and finding counts are maintained as they change
+        if self._completion_durations:
+            context['tasks']['average_completion_time'] = (
+                self._completion_time_sum / len(self._completion_durations))
         
         # Top patterns
-        top_patterns = sorted(self.finding_patterns.items(), key=lambda x: x[1], reverse=True)[:5]
+        top_patterns = self.finding_patterns.most_common(5)
         context['findings']['top_patterns'] = [{'pattern': p[0], 'count': p[1]} for p in top_patterns]
         
         # Read project goals if exists
@@ -931,6 +1477,16 @@ class EnhancedAgentCoordinator:
         
         return context
     
+    def get_project_context_json(self) -> str:
+        """Project context as indented JSON, cached for context_cache_ttl seconds"""
+        now = time.monotonic()
+        if self._context_cache is not None and now - self._context_cache[0] < self.context_cache_ttl:
+            return self._context_cache[1]
+        
+        text = json.dumps(self.get_project_context(), indent=2)
+        self._context_cache = (now, text)
+        return text
+    
     def _generate_insights(self, context: Dict) -> List[str]:
         """Generate actionable insights from context"""
         insights = []
@@ -1132,8 +1688,7 @@ async def handle_call_tool(
             return [types.TextContent(type="text", text=f"Worktree created at: {path}")]
         
         elif name == "get_project_context":
-            context = coordinator.get_project_context()
-            return [types.TextContent(type="text", text=json.dumps(context, indent=2))]
+            return [types.TextContent(type="text", text=coordinator.get_project_context_json())]
         
         elif name == "create_task":
             result = coordinator.create_task(
@@ -1180,15 +1735,19 @@ async def main():
     logger.info(f"Base directory: {coordinator.base_dir}")
     logger.info(f"Data directory: {coordinator.data_dir}")
     
-    async with stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name="mcp-coordinator-v2",
-                server_version="2.0.0"
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await server.run(
+                read_stream,
+                write_stream,
+                InitializationOptions(
+                    server_name="mcp-coordinator-v2",
+                    server_version="2.0.0"
+                )
             )
-        )
+    finally:
+        # Don't lose changes still waiting on the save loop
+        coordinator.flush_state()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
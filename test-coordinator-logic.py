@@ -191,6 +191,34 @@ def test_coordinator():
     assert security_pattern_count >= 3
     print("✅ Pattern recognition working")
     
+    # Test 10: Re-dispatch after a task is set back to pending
+    # Not yet runnable as shipped: like Tests 1-9 it needs the module to
+    # import (mcp_coordinator vs mcp-coordinator, the await in
+    # create_worktree, and __init__'s create_task calls need a running loop)
+    print("\n📋 Test 10: Re-pending Dispatch")
+    
+    coordinator.register_agent("test-coder-001", "coder", ["coding"])
+    coordinator.register_agent("test-tester-001", "tester", ["testing"])
+    coordinator.create_task("implement", "Implement retry handling", priority="critical")
+    coordinator.create_task("test", "Test retry handling", priority="critical")
+    
+    for agent_id, role in (("test-coder-001", "coder"), ("test-tester-001", "tester")):
+        task = coordinator.get_next_task(agent_id, role)
+        assert task is not None
+        
+        # Agent hands the task back; it must be dispatched again to its role
+        coordinator.update_task(task['id'], "pending")
+        again = coordinator.get_next_task(agent_id, role)
+        assert again is not None and again['id'] == task['id'], \
+            f"{role} task not re-dispatched after returning to pending"
+    
+    # Role filtering still applies to re-pended tasks
+    coordinator.update_task(again['id'], "pending")
+    other = coordinator.get_next_task("test-coder-001", "coder")
+    assert other is None or other['id'] != again['id']
+    assert coordinator.get_next_task("test-tester-001", "tester")['id'] == again['id']
+    print("✅ Re-pending dispatch working")
+    
     # Summary
     print("\n" + "="*50)
     print("✅ All core logic tests passed!")